@@ -0,0 +1,400 @@
+"""Faux serveur OpenAI / Anthropic pour tester et profiler hors ligne
+
+Parle assez des deux protocoles pour les services du dépôt: complétions
+simples ou en flux (SSE), appels d'outils, latence et débit configurables,
+erreurs 500 et 429 injectées.
+
+    python bench/mock_llm.py --port 8100 --latency lognormal:0.4,0.5 --rate-limit-rate 0.05
+    export OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+    export ANTHROPIC_BASE_URL=http://127.0.0.1:8100
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_ANSWER = (
+    "Voici une réponse simulée par le serveur de test. Les données récupérées "
+    "sont présentées de manière naturelle, comme le ferait un vrai modèle."
+)
+
+
+class LatencyDistribution:
+    """Délai avant le premier token: fixed:S, uniform:MIN,MAX ou lognormal:MEDIANE,SIGMA"""
+
+    def __init__(self, spec):
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Distribution inconnue: {spec}")
+
+    def sample(self):
+        if self.kind == "fixed":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            return random.uniform(*self.params)
+        median, sigma = self.params
+        return random.lognormvariate(0, sigma) * median
+
+
+class MockConfig:
+    def __init__(
+        self,
+        latency="fixed:0",
+        tokens_per_second=0.0,
+        error_rate=0.0,
+        rate_limit_rate=0.0,
+        retry_after=1.0,
+        answer=DEFAULT_ANSWER,
+        tool_calls=True,
+    ):
+        self.latency = LatencyDistribution(latency)
+        # 0: tous les tokens d'un coup
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.answer = answer
+        self.tool_calls = tool_calls
+
+
+config = MockConfig()
+app = FastAPI()
+
+
+def _tokens(text):
+    """Découpe en "tokens" (mots et leurs espaces)"""
+    words = text.split(" ")
+    return [word + " " for word in words[:-1]] + [words[-1]]
+
+
+def _injected_error(provider):
+    """Réponse d'erreur tirée au sort, ou None"""
+    roll = random.random()
+    if roll < config.rate_limit_rate:
+        body = (
+            {"error": {"type": "rate_limit_error", "message": "Rate limit (mock)"}}
+            if provider == "openai"
+            else {
+                "type": "error",
+                "error": {"type": "rate_limit_error", "message": "Rate limit (mock)"},
+            }
+        )
+        return JSONResponse(
+            body,
+            status_code=429,
+            headers={"retry-after": str(config.retry_after)},
+        )
+    if roll < config.rate_limit_rate + config.error_rate:
+        body = (
+            {"error": {"type": "server_error", "message": "Erreur simulée"}}
+            if provider == "openai"
+            else {
+                "type": "error",
+                "error": {"type": "api_error", "message": "Erreur simulée"},
+            }
+        )
+        return JSONResponse(body, status_code=500)
+    return None
+
+
+async def _emit(tokens):
+    """Produit les tokens au débit configuré"""
+    delay = 1 / config.tokens_per_second if config.tokens_per_second else 0
+    for token in tokens:
+        if delay:
+            await asyncio.sleep(delay)
+        yield token
+
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _tool_arguments(schema, text):
+    """Arguments plausibles: le texte de l'utilisateur dans chaque champ requis"""
+    arguments = {}
+    properties = schema.get("properties", {})
+    for name in schema.get("required", []):
+        kind = properties.get(name, {}).get("type")
+        if kind == "array":
+            arguments[name] = [text]
+        elif kind in ("integer", "number"):
+            arguments[name] = 1
+        else:
+            arguments[name] = text
+    return arguments
+
+
+def _last_user_text(messages):
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            return content
+        for block in content or []:
+            if block.get("type") == "text":
+                return block["text"]
+    return ""
+
+
+# --- OpenAI: POST /v1/chat/completions ---
+
+
+def _openai_wants_tool(body):
+    """Premier tour avec des outils: le modèle simulé en appelle un"""
+    return (
+        config.tool_calls
+        and body.get("tools")
+        and not any(m.get("role") == "tool" for m in body.get("messages", []))
+    )
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = _injected_error("openai")
+    if error is not None:
+        return error
+
+    await asyncio.sleep(config.latency.sample())
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    model = body.get("model", "mock")
+    tokens = _tokens(config.answer)
+    prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+
+    tool_calls = None
+    if _openai_wants_tool(body):
+        function = body["tools"][0]["function"]
+        text = _last_user_text(body.get("messages", []))
+        tool_calls = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {
+                    "name": function["name"],
+                    "arguments": json.dumps(
+                        _tool_arguments(function.get("parameters", {}), text),
+                        ensure_ascii=False,
+                    ),
+                },
+            }
+        ]
+
+    if not body.get("stream"):
+        message = {
+            "role": "assistant",
+            "content": None if tool_calls else config.answer,
+        }
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+        }
+
+    async def events():
+        def chunk(delta, finish_reason=None):
+            return _sse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+            )
+
+        yield chunk({"role": "assistant", "content": ""})
+        if tool_calls:
+            yield chunk({"tool_calls": [dict(tool_calls[0], index=0)]})
+            yield chunk({}, "tool_calls")
+        else:
+            async for token in _emit(tokens):
+                yield chunk({"content": token})
+            yield chunk({}, "stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+# --- Anthropic: POST /v1/messages ---
+
+
+def _anthropic_wants_tool(body):
+    if not (config.tool_calls and body.get("tools")):
+        return False
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list) and any(
+            block.get("type") == "tool_result" for block in content
+        ):
+            return False
+    return True
+
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    body = await request.json()
+    error = _injected_error("anthropic")
+    if error is not None:
+        return error
+
+    await asyncio.sleep(config.latency.sample())
+    message_id = f"msg_{uuid.uuid4().hex[:24]}"
+    model = body.get("model", "mock")
+    tokens = _tokens(config.answer)
+    input_tokens = len(json.dumps(body.get("messages", []))) // 4
+
+    tool_use = None
+    if _anthropic_wants_tool(body):
+        tool = body["tools"][0]
+        text = _last_user_text(body.get("messages", []))
+        tool_use = {
+            "type": "tool_use",
+            "id": f"toolu_{uuid.uuid4().hex[:24]}",
+            "name": tool["name"],
+            "input": _tool_arguments(tool.get("input_schema", {}), text),
+        }
+    stop_reason = "tool_use" if tool_use else "end_turn"
+
+    if not body.get("stream"):
+        content = [tool_use] if tool_use else [{"type": "text", "text": config.answer}]
+        return {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": len(tokens)},
+        }
+
+    async def events():
+        yield _sse(
+            {
+                "type": "message_start",
+                "message": {
+                    "id": message_id,
+                    "type": "message",
+                    "role": "assistant",
+                    "model": model,
+                    "content": [],
+                    "stop_reason": None,
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": input_tokens, "output_tokens": 0},
+                },
+            },
+            "message_start",
+        )
+        if tool_use:
+            start = dict(tool_use, input={})
+            yield _sse(
+                {"type": "content_block_start", "index": 0, "content_block": start},
+                "content_block_start",
+            )
+            delta = {
+                "type": "input_json_delta",
+                "partial_json": json.dumps(tool_use["input"], ensure_ascii=False),
+            }
+            yield _sse(
+                {"type": "content_block_delta", "index": 0, "delta": delta},
+                "content_block_delta",
+            )
+        else:
+            yield _sse(
+                {
+                    "type": "content_block_start",
+                    "index": 0,
+                    "content_block": {"type": "text", "text": ""},
+                },
+                "content_block_start",
+            )
+            async for token in _emit(tokens):
+                yield _sse(
+                    {
+                        "type": "content_block_delta",
+                        "index": 0,
+                        "delta": {"type": "text_delta", "text": token},
+                    },
+                    "content_block_delta",
+                )
+        yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+        yield _sse(
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                "usage": {"output_tokens": len(tokens)},
+            },
+            "message_delta",
+        )
+        yield _sse({"type": "message_stop"}, "message_stop")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Faux serveur OpenAI / Anthropic")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--latency",
+        default="fixed:0",
+        help="Délai avant le premier token: fixed:S, uniform:MIN,MAX, lognormal:MEDIANE,SIGMA",
+    )
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=0.0, help="0: sans limite"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part de 500")
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="Part de 429"
+    )
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--answer", default=DEFAULT_ANSWER)
+    parser.add_argument(
+        "--no-tool-calls",
+        action="store_true",
+        help="Ne jamais appeler d'outil, même si la requête en propose",
+    )
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        answer=args.answer,
+        tool_calls=not args.no_tool_calls,
+    )
+    print(f"Faux fournisseur LLM sur http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port)
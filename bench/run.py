@@ -0,0 +1,420 @@
+"""Benchmark de bout en bout: chemin API (MxM) contre chemin MCP (M+M)
+
+Les fournisseurs LLM sont remplacés par des bouchons à latence fixe, ou
+par le faux serveur bench/mock_llm.py (--llm-url): on mesure le coût des
+deux architectures, pas celui d'OpenAI ou de Claude.
+
+    python bench/run.py --requests 200 --concurrency 8 --output bench.json
+    python bench/run.py --baseline bench.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from functools import wraps
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPL_API = ROOT / "implAPI"
+IMPL_MCP = ROOT / "implMCP"
+
+# Les deux implémentations ont chacune un module llm: on les charge sous
+# des noms distincts, leurs autres modules ne se recouvrent pas
+sys.path[:0] = [str(ROOT), str(IMPL_API), str(IMPL_MCP)]
+
+from bench.stubs import NoFlight, StubAnthropic, StubOpenAI
+from common.completion_cache import CompletionCache
+
+# Questions représentatives et leur poids dans le mélange par défaut
+DEFAULT_MIX = {
+    "Quels sont les ingrédients de la pizza ?": 3,
+    "Parle-moi du livre 1984": 3,
+    "Ingrédients de la salade et de l'omelette ?": 2,
+    "Que cuisiner avec de la tomate ?": 2,
+    "Un roman sur le rêve américain ?": 1,
+    "Quels plats proposes-tu ?": 1,
+}
+
+# Métriques comparées en mode régression: plus haut est pire, sauf le débit
+LATENCY_KEYS = ("p50", "p95", "p99")
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, q):
+    """Percentile par rang le plus proche"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(durations):
+    """Statistiques en millisecondes d'une liste de durées en secondes"""
+    if not durations:
+        return {"count": 0}
+    ms = [d * 1000 for d in durations]
+    return {
+        "count": len(ms),
+        "mean": round(sum(ms) / len(ms), 3),
+        "p50": round(percentile(ms, 0.50), 3),
+        "p95": round(percentile(ms, 0.95), 3),
+        "p99": round(percentile(ms, 0.99), 3),
+        "max": round(max(ms), 3),
+    }
+
+
+class Recorder:
+    """Durées mesurées par étape"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        self.stages.setdefault(stage, []).append(seconds)
+
+    def wrap_async(self, stage, func):
+        @wraps(func)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+
+        return timed
+
+    def wrap_sync(self, stage, func):
+        @wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+
+        return timed
+
+    def summary(self):
+        return {stage: summarize(values) for stage, values in self.stages.items()}
+
+
+def install_stubs(service, recorder, args):
+    """Remplace les clients LLM par des bouchons chronométrés
+
+    Avec --llm-url, les vrais clients visent le faux serveur
+    (bench/mock_llm.py) et seuls les appels sont chronométrés.
+    """
+    providers = service.providers
+    if args.llm_url:
+        providers.complete = recorder.wrap_async("provider", providers.complete)
+    else:
+        on_call = lambda seconds: recorder.add("provider", seconds)
+        providers.openai_client = StubOpenAI(latency=args.llm_latency, on_call=on_call)
+        providers.claude_client = StubAnthropic(
+            latency=args.llm_latency, on_call=on_call
+        )
+    if not args.coalesce:
+        service.flights = providers.flights = NoFlight()
+    service._build_prompt = recorder.wrap_async("prompt_build", service._build_prompt)
+
+
+def provider_urls(args):
+    if not args.llm_url:
+        return {}
+    return {
+        "openai_base_url": f"{args.llm_url.rstrip('/')}/v1",
+        "claude_base_url": args.llm_url,
+    }
+
+
+def api_is_up(url):
+    try:
+        return httpx.get(f"{url}/foods", params={"limit": 1}, timeout=1.0).is_success
+    except httpx.HTTPError:
+        return False
+
+
+def start_api(url, timeout=20.0):
+    """Lance implAPI/api.py si l'API ne répond pas déjà; renvoie le processus"""
+    if api_is_up(url):
+        return None
+    process = subprocess.Popen(
+        [sys.executable, str(IMPL_API / "api.py")],
+        cwd=IMPL_API,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if api_is_up(url):
+            return process
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"L'API ne répond pas sur {url}")
+
+
+async def make_api_service(recorder, args):
+    api_llm = load_module("bench_api_llm", IMPL_API / "llm.py")
+    service = api_llm.LLMService(
+        api_base_url=args.api_url,
+        pool_size=args.concurrency,
+        cache=CompletionCache(max_entries=0 if not args.warm_caches else 1024),
+        **provider_urls(args),
+    )
+    install_stubs(service, recorder, args)
+    if not args.warm_caches:
+        service.http.cache_size = 0
+
+    http = service.http
+    request = http.request
+
+    async def timed_request(*a, **kw):
+        started = time.perf_counter()
+        response = await request(*a, **kw)
+        recorder.add("http_roundtrip", time.perf_counter() - started)
+        # Le cache du client renvoie le même objet: on ne l'enveloppe qu'une fois
+        if "json" not in vars(response):
+            response.json = recorder.wrap_sync("json_parse", response.json)
+        return response
+
+    http.request = timed_request
+    return service, service.close
+
+
+async def make_mcp_service(recorder, args):
+    mcp_llm = load_module("bench_mcp_llm", IMPL_MCP / "llm.py")
+    from mcp_client import MCPClient
+    from mcp_pool import MCPClientPool
+    from tool_cache import ToolResultCache
+
+    def make_client():
+        cache = ToolResultCache(max_entries=1024 if args.warm_caches else 0)
+        client = MCPClient(
+            transport=args.mcp_transport,
+            cache=cache,
+            flights=None if args.coalesce else NoFlight(),
+        )
+        connect = client.connect
+
+        async def timed_connect():
+            started = time.perf_counter()
+            ok = await connect()
+            # Sous-processus + handshake initialize + list_tools
+            recorder.add("mcp_spawn", time.perf_counter() - started)
+            if ok:
+                client.session.call_tool = recorder.wrap_async(
+                    "mcp_call_tool", client.session.call_tool
+                )
+            return ok
+
+        client.connect = timed_connect
+        client._parse_result = recorder.wrap_sync("json_parse", client._parse_result)
+        return client
+
+    pool = MCPClientPool(
+        size=args.mcp_pool_size,
+        min_size=args.mcp_pool_size,
+        client_factory=make_client,
+    )
+    await pool.start()
+    service = mcp_llm.MCPLLMService(
+        pool=pool,
+        cache=CompletionCache(max_entries=0 if not args.warm_caches else 1024),
+        **provider_urls(args),
+    )
+    install_stubs(service, recorder, args)
+
+    async def close():
+        await service.close_mcp()
+        await pool.close()
+
+    return service, close
+
+
+async def drive(service, queries, args, recorder):
+    """Envoie les requêtes avec args.concurrency appels simultanés"""
+    queue = asyncio.Queue()
+    for query in queries:
+        queue.put_nowait(query)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                query = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            answer = await service.process_with_openai(query)
+            latencies.append(time.perf_counter() - started)
+            if not answer or answer.startswith("Erreur"):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": summarize(latencies),
+        "stages_ms": recorder.summary(),
+    }
+
+
+async def bench_path(name, factory, queries, args):
+    recorder = Recorder()
+    service, close = await factory(recorder, args)
+    try:
+        # Échauffement: matcher, connexions; mesures remises à zéro ensuite
+        await drive(service, queries[: args.warmup], args, recorder)
+        spawn = recorder.stages.get("mcp_spawn")
+        recorder.stages = {"mcp_spawn": spawn} if spawn else {}
+        result = await drive(service, queries, args, recorder)
+    finally:
+        await close()
+    print(
+        f"{name}: {result['requests']} requêtes, "
+        f"p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, "
+        f"{result['throughput_rps']} req/s",
+        file=sys.stderr,
+    )
+    return result
+
+
+def build_queries(args):
+    mix = DEFAULT_MIX
+    if args.mix:
+        with open(args.mix, encoding="utf-8") as f:
+            mix = json.load(f)
+    rng = random.Random(args.seed)
+    return rng.choices(list(mix), weights=list(mix.values()), k=args.requests)
+
+
+def compare(results, baseline, threshold):
+    """Liste des régressions au-delà du seuil relatif"""
+    regressions = []
+    for path, current in results["paths"].items():
+        previous = baseline.get("paths", {}).get(path)
+        if previous is None:
+            continue
+        for key in LATENCY_KEYS:
+            old, new = previous["latency_ms"].get(key), current["latency_ms"].get(key)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{path} latence {key}: {old} -> {new} ms")
+        old, new = previous.get("throughput_rps"), current.get("throughput_rps")
+        if old and new and new < old * (1 - threshold):
+            regressions.append(f"{path} débit: {old} -> {new} req/s")
+    return regressions
+
+
+async def main(args):
+    # Les SDK exigent une clé, même pour un bouchon ou le faux serveur
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("CLAUD_API_KEY", "bench")
+    queries = build_queries(args)
+    results = {
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline")
+        },
+        "paths": {},
+    }
+
+    api_process = None
+    try:
+        if "api" in args.paths:
+            api_process = start_api(args.api_url)
+            results["paths"]["api"] = await bench_path(
+                "api", make_api_service, queries, args
+            )
+        if "mcp" in args.paths:
+            results["paths"]["mcp"] = await bench_path(
+                "mcp", make_mcp_service, queries, args
+            )
+    finally:
+        if api_process is not None:
+            api_process.terminate()
+            api_process.wait()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark des chemins API et MCP (fournisseurs LLM simulés)"
+    )
+    parser.add_argument(
+        "--paths", nargs="+", choices=["api", "mcp"], default=["api", "mcp"]
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--mix", help='Fichier JSON {"question": poids, ...}')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="Latence simulée du LLM (s)"
+    )
+    parser.add_argument(
+        "--llm-url",
+        help="Faux serveur LLM à utiliser à la place des bouchons (bench/mock_llm.py)",
+    )
+    parser.add_argument(
+        "--api-url", default=os.getenv("API_BASE_URL", "http://localhost:8000")
+    )
+    parser.add_argument(
+        "--mcp-transport",
+        choices=["stdio", "streamable-http"],
+        default=os.getenv("MCP_TRANSPORT", "stdio"),
+    )
+    parser.add_argument("--mcp-pool-size", type=int, default=4)
+    parser.add_argument(
+        "--warm-caches",
+        action="store_true",
+        help="Garde les caches (réponses, outils, ETags) actifs",
+    )
+    parser.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="Garde le regroupement des appels identiques en cours",
+    )
+    parser.add_argument("--output", help="Fichier JSON de résultats (défaut: stdout)")
+    parser.add_argument("--baseline", help="Résultats de référence à comparer")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Dégradation relative tolérée avant d'échouer (0.10 = 10%%)",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Régression: {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
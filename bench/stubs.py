@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+DEFAULT_ANSWER = "Réponse simulée pour le benchmark. " * 8
+
+
+class _StubProvider:
+    """Base des faux clients: latence fixe puis réponse découpée en morceaux"""
+
+    def __init__(self, latency=0.0, answer=DEFAULT_ANSWER, chunk_size=16, on_call=None):
+        self.latency = latency
+        self.answer = answer
+        self.chunk_size = chunk_size
+        # on_call(secondes) après chaque réponse, pour le découpage par étape
+        self.on_call = on_call
+
+    def _chunks(self):
+        for start in range(0, len(self.answer), self.chunk_size):
+            yield self.answer[start : start + self.chunk_size]
+
+    async def _wait(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.sleep(self.latency)
+        if self.on_call is not None:
+            self.on_call(loop.time() - started)
+
+    async def close(self):
+        pass
+
+
+class StubOpenAI(_StubProvider):
+    """Remplace AsyncOpenAI: chat.completions.create, avec ou sans stream"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, stream=False, **kwargs):
+        await self._wait()
+        if stream:
+            return self._stream()
+        message = SimpleNamespace(content=self.answer, tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def _stream(self):
+        for text in self._chunks():
+            delta = SimpleNamespace(content=text)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class _StubMessageStream:
+    def __init__(self, provider):
+        self._provider = provider
+
+    async def __aenter__(self):
+        await self._provider._wait()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    async def text_stream(self):
+        for text in self._provider._chunks():
+            yield text
+
+
+class StubAnthropic(_StubProvider):
+    """Remplace AsyncAnthropic: messages.create et messages.stream"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.messages = SimpleNamespace(create=self._create, stream=self._stream)
+
+    async def _create(self, **kwargs):
+        await self._wait()
+        block = SimpleNamespace(type="text", text=self.answer)
+        return SimpleNamespace(content=[block], stop_reason="end_turn")
+
+    def _stream(self, **kwargs):
+        return _StubMessageStream(self)
+
+
+class NoFlight:
+    """Remplace SingleFlight: chaque appel part réellement, sans regroupement"""
+
+    async def do(self, key, factory):
+        return await factory()
+
+    async def stream(self, key, factory):
+        async for chunk in factory():
+            yield chunk
+
+    def stats(self):
+        return {}
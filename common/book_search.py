@@ -0,0 +1,99 @@
+import heapq
+import math
+
+from common.text import tokenize
+
+# Mots vides français (déjà normalisés: sans accents, au singulier)
+STOPWORDS = frozenset(
+    tokenize(
+        "le la les l un une des de du d au aux a à et ou en dans sur sous par pour"
+        " avec sans ce cet cette ces son sa ses leur leurs qui que quoi dont où"
+        " est sont il elle ils elles on je tu nous vous me te se y ne pas plus"
+        " livre livres roman romans parle parlant sujet quel quelle quels quelles"
+    )
+)
+
+# Poids des champs: un mot du titre compte plus qu'un mot du résumé
+FIELD_WEIGHTS = {"titre": 3, "auteur": 2, "resume": 1}
+
+
+def analyze(text):
+    """Mots indexables d'un texte: normalisés, sans mots vides"""
+    return [
+        _stem(token)
+        for token in tokenize(text)
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+def _stem(token):
+    """Racinisation légère: "dystopie" et "dystopique" ont la même racine"""
+    for suffix in ("ique", "ie", "e"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[: -len(suffix)]
+    return token
+
+
+class BookSearchIndex:
+    """Recherche plein texte BM25 sur le titre, l'auteur et le résumé des livres"""
+
+    def __init__(self, books, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys = list(books)
+        # Mot -> [(identifiant du livre, fréquence pondérée, longueur du livre)]
+        self.postings = {}
+
+        total_length = 0
+        for book_id, key in enumerate(self.keys):
+            book = books[key]
+            frequencies = {}
+            length = 0
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in analyze(str(book.get(field, ""))):
+                    frequencies[term] = frequencies.get(term, 0) + weight
+                    length += weight
+            total_length += length
+            for term, frequency in frequencies.items():
+                self.postings.setdefault(term, []).append((book_id, frequency, length))
+
+        count = len(self.keys)
+        self.average_length = total_length / count if count else 0.0
+
+    @classmethod
+    def from_postings(cls, keys, postings, average_length, k1=1.2, b=0.75):
+        """Index déjà construit, par exemple lu dans un catalogue mmap
+
+        keys est la séquence des clés par identifiant, postings un mapping
+        mot -> [(identifiant, fréquence, longueur)].
+        """
+        index = cls.__new__(cls)
+        index.k1 = k1
+        index.b = b
+        index.keys = keys
+        index.postings = postings
+        index.average_length = average_length
+        return index
+
+    def _idf(self, document_frequency):
+        count = len(self.keys)
+        return math.log(
+            1 + (count - document_frequency + 0.5) / (document_frequency + 0.5)
+        )
+
+    def search(self, query, k=5):
+        """Renvoie les k meilleurs livres: [(clé, score)] par score décroissant"""
+        scores = {}
+        for term in set(analyze(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self._idf(len(posting))
+            for book_id, frequency, length in posting:
+                norm = self.k1 * (1 - self.b + self.b * length / self.average_length)
+                score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                scores[book_id] = scores.get(book_id, 0.0) + score
+
+        # Sélection par tas: pas de tri complet des livres trouvés
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.keys[book_id], round(score, 4)) for book_id, score in best]
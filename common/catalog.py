@@ -0,0 +1,350 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from functools import cached_property
+from pathlib import Path
+
+from common.book_search import BookSearchIndex
+from common.ingredient_index import IngredientIndex
+from common.mmap_catalog import MmapCatalog, write_mmap_catalog
+from common.text import normalize
+
+# Catalogue de départ, utilisé pour créer la base si elle n'existe pas encore
+DEFAULT_FOOD_DATA = {
+    "pizza": ["farine", "tomate", "mozzarella", "huile d'olive", "basilic"],
+    "salade": ["laitue", "tomate", "concombre", "vinaigrette", "oignon"],
+    "omelette": ["œufs", "beurre", "sel", "poivre", "herbes"],
+    "pâtes": ["pâtes", "sauce tomate", "parmesan", "ail", "huile"],
+}
+
+DEFAULT_BOOK_DATA = {
+    "1984": {
+        "titre": "1984",
+        "auteur": "George Orwell",
+        "annee": 1949,
+        "resume": "Roman dystopique sur la surveillance totalitaire",
+    },
+    "gatsby": {
+        "titre": "Gatsby le Magnifique",
+        "auteur": "F. Scott Fitzgerald",
+        "annee": 1925,
+        "resume": "Histoire tragique du rêve américain dans les années 20",
+    },
+    "hamlet": {
+        "titre": "Hamlet",
+        "auteur": "William Shakespeare",
+        "annee": 1603,
+        "resume": "Tragédie du prince du Danemark",
+    },
+}
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent.parent / "data" / "catalog.db"
+
+
+class CatalogSnapshot:
+    """Vue en lecture seule du catalogue à un instant donné
+
+    Une requête garde la même snapshot du début à la fin, même si le
+    catalogue est rechargé entre-temps.
+    """
+
+    def __init__(self, foods, books, version, **prebuilt):
+        # foods/books: dict en mémoire, ou sections mmap décodées à la demande
+        self.foods = foods
+        self.books = books
+        self.version = version
+        self.loaded_at = time.time()
+        # Index déjà présents dans le fichier (format mmap): rien à reconstruire
+        self.__dict__.update(prebuilt)
+
+    @cached_property
+    def food_index(self):
+        """Nom normalisé (accents, casse, pluriel) -> clé du plat"""
+        return {normalize(name): name for name in self.foods}
+
+    @cached_property
+    def book_index(self):
+        """Clé ou titre normalisé -> clé du livre"""
+        index = {normalize(book["titre"]): key for key, book in self.books.items()}
+        index.update({normalize(key): key for key in self.books})
+        return index
+
+    @cached_property
+    def food_keys(self):
+        """Clés des plats triées, pour la pagination"""
+        return sorted(self.foods)
+
+    @cached_property
+    def book_keys(self):
+        """Clés des livres triées, pour la pagination"""
+        return sorted(self.books)
+
+    @cached_property
+    def ingredient_index(self):
+        """Index inversé ingrédient -> plats"""
+        return IngredientIndex(self.foods)
+
+    @cached_property
+    def book_search(self):
+        """Index plein texte BM25 sur les livres"""
+        return BookSearchIndex(self.books)
+
+    def warm(self):
+        """Construit les index avant que la snapshot ne serve des requêtes"""
+        self.food_index
+        self.book_index
+        # Ancien fichier mmap sans postings: index construits au premier usage
+        # pour ne pas décoder tous les enregistrements à chaque chargement
+        if isinstance(self.foods, dict):
+            self.food_keys
+            self.ingredient_index
+        if isinstance(self.books, dict):
+            self.book_keys
+            self.book_search
+        return self
+
+    def find_food(self, name):
+        """Renvoie la clé du plat correspondant à name, ou None"""
+        key = name.lower()
+        if key in self.foods:
+            return key
+        return self.food_index.get(normalize(name))
+
+    def find_book(self, name):
+        """Renvoie la clé du livre correspondant à name, ou None"""
+        key = name.lower()
+        if key in self.books:
+            return key
+        return self.book_index.get(normalize(name))
+
+
+def write_sqlite_catalog(path, foods, books):
+    """Écrit un catalogue SQLite complet puis le met en place de façon atomique"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        db = sqlite3.connect(tmp_path)
+        db.execute("CREATE TABLE foods (name TEXT PRIMARY KEY, ingredients TEXT)")
+        db.execute(
+            """
+            CREATE TABLE books (
+                key TEXT PRIMARY KEY,
+                titre TEXT,
+                auteur TEXT,
+                annee INTEGER,
+                resume TEXT
+            )
+            """
+        )
+        db.executemany(
+            "INSERT INTO foods VALUES (?, ?)",
+            (
+                (name, json.dumps(ingredients, ensure_ascii=False))
+                for name, ingredients in foods.items()
+            ),
+        )
+        db.executemany(
+            "INSERT INTO books VALUES (?, ?, ?, ?, ?)",
+            (
+                (key, b["titre"], b["auteur"], b["annee"], b["resume"])
+                for key, b in books.items()
+            ),
+        )
+        db.commit()
+        db.close()
+        # Les lecteurs voient l'ancien fichier ou le nouveau, jamais un état partiel
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_sqlite_catalog(path, version):
+    """Charge un catalogue SQLite en mémoire"""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        foods = {
+            name: json.loads(ingredients)
+            for name, ingredients in db.execute("SELECT name, ingredients FROM foods")
+        }
+        books = {
+            key: {"titre": titre, "auteur": auteur, "annee": annee, "resume": resume}
+            for key, titre, auteur, annee, resume in db.execute(
+                "SELECT key, titre, auteur, annee, resume FROM books"
+            )
+        }
+    finally:
+        db.close()
+    return CatalogSnapshot(foods, books, version)
+
+
+def load_mmap_catalog(path, version):
+    """Ouvre un catalogue mmap: seules les pages lues sont chargées"""
+    sections = MmapCatalog(path).sections
+    foods, books = sections["foods"], sections["books"]
+    prebuilt = {
+        "food_index": sections["food_idx"],
+        "book_index": sections["book_idx"],
+        "food_keys": foods.sorted_keys(),
+        "book_keys": books.sorted_keys(),
+    }
+    # Postings écrits dans le fichier: les recherches lisent le mapping
+    # au lieu de reconstruire les index dans le tas de chaque worker
+    if "ing_idx" in sections:
+        prebuilt["ingredient_index"] = IngredientIndex.from_postings(
+            prebuilt["food_keys"], sections["ing_idx"]
+        )
+    if "bm25_idx" in sections:
+        prebuilt["book_search"] = BookSearchIndex.from_postings(
+            prebuilt["book_keys"],
+            sections["bm25_idx"],
+            sections["meta"]["bm25_average_length"],
+        )
+    return CatalogSnapshot(foods, books, version, **prebuilt)
+
+
+def is_mmap_path(path):
+    return Path(path).suffix == ".cat"
+
+
+def load_catalog(path, version):
+    """Charge un catalogue selon son format (.cat: mmap, sinon SQLite)"""
+    if is_mmap_path(path):
+        return load_mmap_catalog(path, version)
+    return load_sqlite_catalog(path, version)
+
+
+def write_catalog(path, foods, books):
+    """Écrit un catalogue selon son format (.cat: mmap, sinon SQLite)"""
+    if is_mmap_path(path):
+        write_mmap_catalog(path, foods, books)
+    else:
+        write_sqlite_catalog(path, foods, books)
+
+
+class CatalogStore:
+    """Catalogue partagé, rechargé à chaud quand son fichier change"""
+
+    def __init__(self, path, poll_interval=2.0):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._snapshot = None
+        self._file_version = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+        if not self.path.exists():
+            write_catalog(self.path, DEFAULT_FOOD_DATA, DEFAULT_BOOK_DATA)
+        self.reload()
+
+    def snapshot(self):
+        """Snapshot courante; à récupérer une fois par requête"""
+        return self._snapshot
+
+    def add_listener(self, callback):
+        """Appelle callback(snapshot) après chaque rechargement"""
+        self._listeners.append(callback)
+
+    def _stat_version(self):
+        stat = self.path.stat()
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    def reload(self, force=False):
+        """Recharge le fichier s'il a changé; renvoie True si la snapshot a changé"""
+        with self._reload_lock:
+            version = self._stat_version()
+            if not force and version == self._file_version:
+                return False
+
+            # La nouvelle snapshot est entièrement prête avant d'être publiée
+            snapshot = load_catalog(self.path, version).warm()
+            self._snapshot = snapshot
+            self._file_version = version
+
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Erreur dans un listener du catalogue: {e}", file=sys.stderr)
+        return True
+
+    def watch(self):
+        """Surveille le fichier dans un thread d'arrière-plan"""
+        if self._watcher is None:
+            self._watcher = threading.Thread(
+                target=self._watch_loop, name="catalog-watcher", daemon=True
+            )
+            self._watcher.start()
+        return self
+
+    def _watch_loop(self):
+        # Journal sur stderr: stdout sert au protocole MCP en mode stdio
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self.reload():
+                    print(
+                        f"Catalogue rechargé (version {self._file_version})",
+                        file=sys.stderr,
+                    )
+            except Exception as e:
+                # Fichier en cours de remplacement ou invalide: on garde l'ancien
+                print(f"Rechargement du catalogue impossible: {e}", file=sys.stderr)
+
+    def stop(self):
+        self._stop.set()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_catalog():
+    """Catalogue partagé du processus (CATALOG_PATH, CATALOG_POLL_INTERVAL)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CatalogStore(
+                    os.getenv("CATALOG_PATH") or DEFAULT_CATALOG_PATH,
+                    poll_interval=float(os.getenv("CATALOG_POLL_INTERVAL", "2")),
+                ).watch()
+    return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Crée ou remplace le catalogue (.db: SQLite, .cat: mmap)"
+    )
+    parser.add_argument("path", nargs="?", default=str(DEFAULT_CATALOG_PATH))
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--import-json",
+        help='Fichier JSON {"foods": {...}, "books": {...}} à charger',
+    )
+    source.add_argument(
+        "--from-catalog", help="Catalogue existant (.db ou .cat) à convertir"
+    )
+    args = parser.parse_args()
+
+    if args.import_json:
+        with open(args.import_json, encoding="utf-8") as f:
+            data = json.load(f)
+        foods, books = data.get("foods", {}), data.get("books", {})
+    elif args.from_catalog:
+        snapshot = load_catalog(args.from_catalog, version=None)
+        foods, books = snapshot.foods, snapshot.books
+    else:
+        foods, books = DEFAULT_FOOD_DATA, DEFAULT_BOOK_DATA
+
+    write_catalog(args.path, foods, books)
+    print(f"Catalogue écrit: {args.path} ({len(foods)} plats, {len(books)} livres)")
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+_DONE = object()
+
+
+class StreamStats:
+    """Mesures d'un flux: latence totale, délai avant premier morceau, tokens"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_chunk = None
+        self.finished = None
+        self.chars = 0
+        self.chunks = 0
+
+    def add(self, chunk):
+        if self.first_chunk is None:
+            self.first_chunk = time.monotonic()
+        self.chunks += 1
+        self.chars += len(chunk)
+
+    def as_dict(self):
+        end = self.finished or time.monotonic()
+        return {
+            "latence_s": round(end - self.started, 3),
+            "ttft_s": (
+                None
+                if self.first_chunk is None
+                else round(self.first_chunk - self.started, 3)
+            ),
+            "morceaux": self.chunks,
+            # Estimé comme ProviderScheduler.estimate_tokens: les flux ne renvoient pas l'usage
+            "tokens": self.chars // 4,
+        }
+
+
+async def merge_streams(factories, on_done=None):
+    """Lance plusieurs flux en parallèle; produit des tuples (nom, morceau)
+
+    factories associe un nom à une fabrique de générateur asynchrone. Les
+    morceaux sont relayés dans leur ordre d'arrivée; on_done(nom, mesures)
+    est appelé à la fin de chaque flux. Si l'appelant s'arrête, les flux
+    encore actifs sont annulés.
+    """
+    queue = asyncio.Queue()
+
+    async def pump(name, factory):
+        stats = StreamStats()
+        try:
+            async for chunk in factory():
+                stats.add(chunk)
+                await queue.put((name, chunk))
+        finally:
+            stats.finished = time.monotonic()
+            if on_done is not None:
+                on_done(name, stats.as_dict())
+            await queue.put((name, _DONE))
+
+    tasks = [
+        asyncio.ensure_future(pump(name, factory))
+        for name, factory in factories.items()
+    ]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            name, chunk = await queue.get()
+            if chunk is _DONE:
+                remaining -= 1
+                continue
+            yield name, chunk
+        # Remonte une éventuelle erreur d'un flux
+        for task in tasks:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CompletionCache:
+    """Cache des complétions LLM: LRU en mémoire + SQLite optionnel, avec TTL"""
+
+    def __init__(
+        self, max_entries=1024, ttl=3600.0, db_path=None, max_db_entries=100_000
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        self._db = None
+        self._db_count = 0
+        if db_path:
+            self._open_db(db_path)
+
+    @classmethod
+    def from_env(cls):
+        """Configure le cache depuis LLM_CACHE_SIZE, LLM_CACHE_TTL et LLM_CACHE_PATH"""
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+            db_path=os.getenv("LLM_CACHE_PATH") or None,
+        )
+
+    @staticmethod
+    def make_key(provider, model, temperature, prompt):
+        """Clé stable sur (fournisseur, modèle, température, prompt normalisé)"""
+        # Les espaces et la casse ne changent pas la question posée
+        normalized = " ".join(prompt.split()).casefold()
+        payload = json.dumps(
+            [provider, model, temperature, normalized], ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _open_db(self, db_path):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS completions_accessed ON completions(accessed_at)"
+        )
+        # Purge des entrées expirées au démarrage
+        self._db.execute(
+            "DELETE FROM completions WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        self._db.commit()
+        self._db_count = self._db.execute(
+            "SELECT COUNT(*) FROM completions"
+        ).fetchone()[0]
+
+    def get(self, key):
+        """Renvoie la complétion en cache, ou None si absente ou expirée"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if now - created_at <= self.ttl:
+                        self._db.execute(
+                            "UPDATE completions SET accessed_at = ? WHERE key = ?",
+                            (now, key),
+                        )
+                        self._db.commit()
+                        self._remember(key, value, created_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._db_count -= 1
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Enregistre une complétion en mémoire et sur disque"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+
+            if self._db is not None:
+                exists = self._db.execute(
+                    "SELECT 1 FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                if not exists:
+                    self._db_count += 1
+                excess = self._db_count - self.max_db_entries
+                if excess > 0:
+                    # Évince les entrées les moins récemment utilisées
+                    self._db.execute(
+                        """
+                        DELETE FROM completions WHERE key IN (
+                            SELECT key FROM completions ORDER BY accessed_at LIMIT ?
+                        )
+                        """,
+                        (excess,),
+                    )
+                    self._db_count -= excess
+                    self.evictions += excess
+                self._db.commit()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Compteurs de hits/misses et tailles du cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._db_count,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        """Vide le cache mémoire et disque"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM completions")
+                self._db.commit()
+                self._db_count = 0
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,120 @@
+from collections import deque, namedtuple
+
+from common.text import normalize
+
+# Mots qui indiquent le type de question, sans désigner d'élément précis
+FOOD_INTENT_WORDS = ["ingrédient", "plat", "nourriture", "recette", "cuisine"]
+BOOK_INTENT_WORDS = ["livre", "auteur", "roman", "histoire"]
+# Recherche inverse: quels plats avec ces ingrédients
+REVERSE_INTENT_WORDS = ["avec", "cuisiner", "contenant", "à base de"]
+
+Match = namedtuple("Match", ["kind", "value", "start", "end"])
+
+
+class EntityMatcher:
+    """Automate Aho-Corasick sur les noms du catalogue et les mots d'intention
+
+    Les noms et la requête sont normalisés (accents, casse, pluriels) puis
+    la requête est parcourue une seule fois, quel que soit le nombre de noms.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._patterns = [[]]
+        self._output = [[]]
+        self._built = False
+
+    @classmethod
+    def from_catalog(cls, foods=(), books=(), ingredients=()):
+        """Construit le matcher à partir des noms de plats, livres et ingrédients"""
+        matcher = cls()
+        for word in FOOD_INTENT_WORDS:
+            matcher.add(word, "intent", "food")
+        for word in BOOK_INTENT_WORDS:
+            matcher.add(word, "intent", "book")
+        for word in REVERSE_INTENT_WORDS:
+            matcher.add(word, "intent", "reverse")
+        for name in foods:
+            matcher.add(name, "food", name)
+        for name in books:
+            matcher.add(name, "book", name)
+        for name in ingredients:
+            matcher.add(name, "ingredient", name)
+        matcher.build()
+        return matcher
+
+    def add(self, phrase, kind, value):
+        """Ajoute un motif; value est renvoyée telle quelle lors d'un match"""
+        normalized = normalize(phrase)
+        if not normalized:
+            return
+        # Les espaces autour du motif imposent des frontières de mots
+        state = 0
+        for char in f" {normalized} ":
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._patterns.append([])
+            state = next_state
+        self._patterns[state].append((kind, value, len(normalized) + 2))
+        self._built = False
+
+    def build(self):
+        """Calcule les liens d'échec (parcours en largeur du trie)"""
+        self._output = [list(patterns) for patterns in self._patterns]
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+        self._built = True
+
+    def find(self, text):
+        """Renvoie toutes les occurrences de motifs dans le texte normalisé"""
+        if not self._built:
+            self.build()
+
+        matches = []
+        state = 0
+        for position, char in enumerate(f" {normalize(text)} "):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for kind, value, length in self._output[state]:
+                matches.append(Match(kind, value, position + 1 - length, position))
+        return matches
+
+    def analyze(self, text):
+        """Regroupe les matches par type: {"food": [...], "book": [...], ...}
+
+        Un nom inclus dans un nom plus long du même type ("pain" dans
+        "pain perdu") est ignoré.
+        """
+        result = {"food": [], "book": [], "ingredient": [], "intent": []}
+        spans = {}
+        for match in sorted(self.find(text), key=lambda m: (m.start, m.start - m.end)):
+            if match.kind != "intent":
+                kind_spans = spans.setdefault(match.kind, [])
+                if any(
+                    start <= match.start and match.end <= end
+                    for start, end in kind_spans
+                ):
+                    continue
+                kind_spans.append((match.start, match.end))
+            values = result.setdefault(match.kind, [])
+            if match.value not in values:
+                values.append(match.value)
+        return result
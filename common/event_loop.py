@@ -0,0 +1,102 @@
+import asyncio
+import atexit
+import concurrent.futures
+import sys
+import threading
+
+
+class BackgroundEventLoop:
+    """Boucle asyncio unique, dans un thread d'arrière-plan, pour tout le processus
+
+    Les scripts Streamlit (synchrones, relancés à chaque interaction) y
+    soumettent leurs coroutines; les clients async, connexions et caches
+    créés sur cette boucle survivent donc aux requêtes et aux sessions.
+    """
+
+    def __init__(self, name="async-loop", shutdown_timeout=10.0):
+        self.loop = asyncio.new_event_loop()
+        self.shutdown_timeout = shutdown_timeout
+        self._closers = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Planifie la coroutine sur la boucle; renvoie un concurrent.futures.Future"""
+        if self._closed:
+            coro.close()
+            raise RuntimeError("La boucle d'arrière-plan est arrêtée")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Exécute la coroutine et attend son résultat (annulée si timeout dépassé)"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Pas de résultat après {timeout} s") from None
+        except BaseException:
+            # Script interrompu (rerun Streamlit, Ctrl+C): la tâche ne doit pas continuer seule
+            future.cancel()
+            raise
+
+    def stream(self, agen, timeout=None):
+        """Parcourt un générateur asynchrone depuis du code synchrone
+
+        timeout s'applique à chaque morceau; le générateur est toujours fermé
+        sur la boucle, même si l'appelant s'arrête en cours de route.
+        """
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+        finally:
+            if not self._closed:
+                self.run(agen.aclose(), self.shutdown_timeout)
+
+    def on_shutdown(self, closer):
+        """Enregistre une fabrique de coroutine de fermeture (ex.: pool.close)
+
+        Les fermetures sont exécutées sur la boucle, dans l'ordre inverse.
+        """
+        self._closers.append(closer)
+        return closer
+
+    async def _close_all(self):
+        for closer in reversed(self._closers):
+            try:
+                await closer()
+            except Exception as e:
+                print(f"Erreur lors de la fermeture: {e}", file=sys.stderr)
+        # Ce qui tourne encore (maintenance, flux abandonnés) est annulé
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.loop.shutdown_asyncgens()
+
+    def shutdown(self):
+        """Ferme les ressources enregistrées puis arrête la boucle et son thread"""
+        if self._closed:
+            return
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._close_all(), self.loop)
+            future.result(self.shutdown_timeout)
+        except Exception as e:
+            print(f"Arrêt incomplet de la boucle: {e}", file=sys.stderr)
+        finally:
+            self._closed = True
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(self.shutdown_timeout)
+            if not self._thread.is_alive():
+                self.loop.close()
+            atexit.unregister(self.shutdown)
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import deque
+
+
+class LatencyTracker:
+    """Temps jusqu'au premier token, par fournisseur, sur une fenêtre glissante"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+
+    def record(self, name, seconds):
+        self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, name, q, default=None, min_samples=10):
+        """Percentile q (0-1) des mesures, ou default s'il y en a trop peu"""
+        samples = self._samples.get(name)
+        if not samples or len(samples) < min_samples:
+            return default
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    async def observe(self, name, agen):
+        """Relaie un flux en mesurant le délai avant son premier morceau"""
+        started = time.monotonic()
+        first = True
+        async for chunk in agen:
+            if first:
+                self.record(name, time.monotonic() - started)
+                first = False
+            yield chunk
+
+    def stats(self):
+        return {
+            name: {
+                "samples": len(samples),
+                "p50": self.percentile(name, 0.5, min_samples=1),
+                "p95": self.percentile(name, 0.95, min_samples=1),
+            }
+            for name, samples in self._samples.items()
+        }
+
+
+class _Candidate:
+    def __init__(self, name, factory):
+        self.name = name
+        self.stream = factory()
+        self.first = asyncio.ensure_future(self.stream.__anext__())
+
+    async def cancel(self):
+        self.first.cancel()
+        try:
+            await self.first
+        except BaseException:
+            pass
+        await self.stream.aclose()
+
+
+async def hedged_stream(primary, secondary, hedge_after):
+    """Flux du premier fournisseur qui répond; produit des tuples (nom, morceau)
+
+    primary et secondary sont des (nom, fabrique de générateur). Le second
+    n'est lancé que si le premier n'a rien produit après hedge_after
+    secondes, ou immédiatement si le premier échoue. Le perdant est annulé.
+    """
+    candidates = [_Candidate(*primary)]
+    pending_secondary = secondary
+    last_error = None
+    winner = None
+    chunk = None
+
+    try:
+        while winner is None:
+            waiting = [candidate.first for candidate in candidates]
+            if not waiting:
+                break
+            timeout = hedge_after if pending_secondary is not None else None
+            done, _ = await asyncio.wait(
+                waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                # Le premier tarde: on lance le second en parallèle
+                candidates.append(_Candidate(*pending_secondary))
+                pending_secondary = None
+                continue
+
+            for candidate in list(candidates):
+                if not candidate.first.done():
+                    continue
+                error = candidate.first.exception()
+                if error is None:
+                    winner, chunk = candidate, candidate.first.result()
+                    break
+                # Échec (ou flux vide): bascule immédiate sur l'autre fournisseur
+                candidates.remove(candidate)
+                if not isinstance(error, StopAsyncIteration):
+                    last_error = error
+                if pending_secondary is not None:
+                    candidates.append(_Candidate(*pending_secondary))
+                    pending_secondary = None
+    finally:
+        for candidate in candidates:
+            if candidate is not winner:
+                await candidate.cancel()
+
+    if winner is None:
+        if last_error is not None:
+            raise last_error
+        return
+
+    try:
+        yield winner.name, chunk
+        async for chunk in winner.stream:
+            yield winner.name, chunk
+    finally:
+        await winner.stream.aclose()
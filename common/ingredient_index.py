@@ -0,0 +1,115 @@
+import heapq
+from bisect import bisect_left
+
+from common.text import normalize
+
+
+def intersect(left, right):
+    """Intersection de deux listes triées d'identifiants
+
+    Quand une liste est beaucoup plus courte, on avance dans l'autre par
+    recherche dichotomique (galop) plutôt que par fusion élément par élément.
+    """
+    if len(left) > len(right):
+        left, right = right, left
+    result = []
+    if len(right) > 8 * len(left):
+        low = 0
+        for value in left:
+            low = bisect_left(right, value, low)
+            if low == len(right):
+                break
+            if right[low] == value:
+                result.append(value)
+        return result
+
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] == right[j]:
+            result.append(left[i])
+            i += 1
+            j += 1
+        elif left[i] < right[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def union(postings):
+    """Union de listes triées, sans doublons"""
+    result = []
+    for value in heapq.merge(*postings):
+        if not result or result[-1] != value:
+            result.append(value)
+    return result
+
+
+class IngredientIndex:
+    """Index inversé: ingrédient normalisé -> plats qui le contiennent
+
+    Chaque plat reçoit un identifiant dans l'ordre alphabétique, et chaque
+    ingrédient pointe vers la liste triée des identifiants de ses plats.
+    Un ingrédient composé ("sauce tomate") est aussi indexé par ses mots.
+    """
+
+    def __init__(self, foods):
+        self.dishes = sorted(foods)
+        self.postings = {}
+        # Les mêmes ingrédients reviennent dans beaucoup de plats
+        terms_cache = {}
+        for dish_id, dish in enumerate(self.dishes):
+            for ingredient in foods[dish]:
+                terms = terms_cache.get(ingredient)
+                if terms is None:
+                    terms = terms_cache[ingredient] = self._terms(ingredient)
+                for term in terms:
+                    posting = self.postings.setdefault(term, [])
+                    # Les plats sont parcourus dans l'ordre: la liste reste triée
+                    if not posting or posting[-1] != dish_id:
+                        posting.append(dish_id)
+
+    @classmethod
+    def from_postings(cls, dishes, postings):
+        """Index déjà construit, par exemple lu dans un catalogue mmap
+
+        dishes est la séquence triée des plats, postings un mapping
+        ingrédient normalisé -> identifiants triés.
+        """
+        index = cls.__new__(cls)
+        index.dishes = dishes
+        index.postings = postings
+        return index
+
+    @staticmethod
+    def _terms(ingredient):
+        phrase = normalize(ingredient)
+        terms = {phrase}
+        if " " in phrase:
+            terms.update(word for word in phrase.split() if len(word) > 2)
+        return terms
+
+    def ingredients(self):
+        """Tous les ingrédients indexés (formes normalisées)"""
+        return sorted(self.postings)
+
+    def query(self, ingredients, mode="and", limit=None):
+        """Plats contenant tous (mode "and") ou au moins un (mode "or") des ingrédients"""
+        postings = [self.postings.get(normalize(name), []) for name in ingredients]
+        if not postings:
+            return []
+
+        if mode == "or":
+            dish_ids = union(postings)
+        else:
+            # Intersection en commençant par la liste la plus courte
+            postings.sort(key=len)
+            dish_ids = postings[0]
+            for posting in postings[1:]:
+                if not dish_ids:
+                    break
+                dish_ids = intersect(dish_ids, posting)
+
+        if limit is not None:
+            dish_ids = dish_ids[:limit]
+        return [self.dishes[dish_id] for dish_id in dish_ids]
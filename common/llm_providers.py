@@ -0,0 +1,241 @@
+import os
+from functools import partial
+
+import anthropic
+import openai
+
+from common.compare import merge_streams
+from common.hedging import LatencyTracker, hedged_stream
+from common.provider_scheduler import ProviderScheduler
+from common.singleflight import SingleFlight
+from common.tracing import tracer
+
+# Noms des fournisseurs tels qu'affichés dans les messages
+LABELS = {"openai": "OpenAI", "claude": "Claude"}
+
+
+class LLMProviders:
+    """Clients OpenAI et Claude derrière leurs ordonnanceurs, communs aux deux services
+
+    Quotas, concurrence adaptative, reprises, cache des complétions et
+    regroupement des appels identiques sont câblés ici une seule fois: les
+    chemins API et MCP ne diffèrent que par la construction du prompt.
+    """
+
+    MAX_TOKENS = 300
+    OPENAI_TEMPERATURE = 0.2
+    # Délai avant de solliciter le second fournisseur, tant qu'il y a peu de mesures
+    HEDGE_DEFAULT_DELAY = 2.0
+
+    def __init__(
+        self,
+        openai_model,
+        claude_model,
+        cache,
+        flights=None,
+        openai_base_url=None,
+        claude_base_url=None,
+    ):
+        self.models = {"openai": openai_model, "claude": claude_model}
+        # Clés lues dans l'environnement; les URL de base permettent de viser un
+        # faux fournisseur (bench/mock_llm.py). Les reprises sont gérées par les
+        # ordonnanceurs, pas par les SDK.
+        self.openai_client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=openai_base_url or os.getenv("OPENAI_BASE_URL") or None,
+            max_retries=0,
+        )
+        self.claude_client = anthropic.AsyncAnthropic(
+            api_key=os.getenv("CLAUD_API_KEY", ""),
+            base_url=claude_base_url or os.getenv("ANTHROPIC_BASE_URL") or None,
+            max_retries=0,
+        )
+        # Quotas, concurrence adaptative et reprises par modèle
+        self.schedulers = {
+            "openai": ProviderScheduler.from_env(
+                "OPENAI", openai_model, retryable=(openai.APIConnectionError,)
+            ),
+            "claude": ProviderScheduler.from_env(
+                "CLAUDE", claude_model, retryable=(anthropic.APIConnectionError,)
+            ),
+        }
+        self.cache = cache
+        # Appels fournisseur identiques en cours, partagés entre utilisateurs
+        self.flights = flights or SingleFlight()
+        # Délai avant premier token, par fournisseur
+        self.ttft = LatencyTracker()
+        # Mode "le plus rapide": fournisseur principal, relayé par l'autre s'il tarde
+        self.primary_provider = os.getenv("LLM_PRIMARY", "openai")
+        self.hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+
+    def cache_key(self, name, prompt):
+        temperature = self.OPENAI_TEMPERATURE if name == "openai" else None
+        return self.cache.make_key(name, self.models[name], temperature, prompt)
+
+    async def create(self, name, messages, **kwargs):
+        """Appel brut (messages complets, outils...) via l'ordonnanceur du fournisseur"""
+        if name == "openai":
+            call = partial(
+                self.openai_client.chat.completions.create,
+                model=self.models[name],
+                temperature=self.OPENAI_TEMPERATURE,
+                messages=messages,
+                max_tokens=self.MAX_TOKENS,
+                **kwargs,
+            )
+        else:
+            call = partial(
+                self.claude_client.messages.create,
+                model=self.models[name],
+                max_tokens=self.MAX_TOKENS,
+                messages=messages,
+                **kwargs,
+            )
+        return await self.schedulers[name].run(
+            call,
+            tokens=ProviderScheduler.estimate_tokens(str(messages), self.MAX_TOKENS),
+        )
+
+    async def complete(self, name, prompt):
+        """Texte de la réponse à un prompt simple"""
+        with tracer.span(f"provider.{name}"):
+            response = await self.create(name, [{"role": "user", "content": prompt}])
+        if name == "openai":
+            return response.choices[0].message.content
+        return response.content[0].text
+
+    async def answer(self, name, prompt):
+        """Réponse en cache ou complétée; message d'erreur si le fournisseur échoue"""
+        cache_key = self.cache_key(name, prompt)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            # Même prompt déjà en cours: on attend la même réponse
+            answer = await self.flights.do(
+                cache_key, partial(self.complete, name, prompt)
+            )
+            self.cache.set(cache_key, answer)
+            return answer
+        except Exception as e:
+            return f"Erreur {LABELS[name]}: {str(e)}"
+
+    async def stream(self, name, prompt, max_retries=None):
+        """Réponse à un prompt simple, morceau par morceau, via l'ordonnanceur"""
+        chunks = self._openai_chunks if name == "openai" else self._claude_chunks
+        stream = self.schedulers[name].stream(
+            partial(chunks, prompt),
+            tokens=ProviderScheduler.estimate_tokens(prompt, self.MAX_TOKENS),
+            max_retries=max_retries,
+        )
+        stream = tracer.stream(f"provider.{name}.stream", stream)
+        async for text in self.ttft.observe(name, stream):
+            yield text
+
+    async def cached_stream(self, name, prompt):
+        """Flux d'un fournisseur: cache, puis flux partagé avec les appels identiques"""
+        cache_key = self.cache_key(name, prompt)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        try:
+            # Même prompt déjà en cours: on s'abonne au même flux
+            async for text in self.flights.stream(
+                cache_key, partial(self.stream, name, prompt)
+            ):
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            yield f"Erreur {LABELS[name]}: {str(e)}"
+            return
+        self.cache.set(cache_key, "".join(chunks))
+
+    async def stream_compare(self, prompt, on_done=None):
+        """OpenAI et Claude en parallèle sur le même prompt
+
+        Produit des tuples (fournisseur, morceau) dans l'ordre d'arrivée;
+        on_done(nom, mesures) reçoit la latence, le délai avant premier token
+        et les tokens estimés.
+        """
+        async for name, text in merge_streams(
+            {name: partial(self.cached_stream, name, prompt) for name in LABELS},
+            on_done=on_done,
+        ):
+            yield name, text
+
+    async def stream_fastest(self, prompt, on_winner=None):
+        """Réponse du fournisseur le plus rapide, morceau par morceau
+
+        Le fournisseur principal (LLM_PRIMARY) part seul. S'il n'a produit
+        aucun token après le percentile LLM_HEDGE_PERCENTILE de ses délais
+        habituels, l'autre est lancé aussi et le plus lent est annulé; une
+        erreur bascule immédiatement sur l'autre. on_winner(nom) est appelé
+        dès que le fournisseur retenu est connu.
+        """
+        primary = self.primary_provider if self.primary_provider in LABELS else "openai"
+        secondary = "claude" if primary == "openai" else "openai"
+        cache_keys = {
+            name: self.cache_key(name, prompt) for name in (primary, secondary)
+        }
+
+        for name in (primary, secondary):
+            cached = self.cache.get(cache_keys[name])
+            if cached is not None:
+                if on_winner is not None:
+                    on_winner(name)
+                yield cached
+                return
+
+        hedge_after = self.ttft.percentile(
+            primary, self.hedge_percentile, default=self.HEDGE_DEFAULT_DELAY
+        )
+        chunks = []
+        winner = None
+        try:
+            # Sans reprise: l'autre fournisseur remplace les reprises, et une
+            # erreur doit parvenir tout de suite à hedged_stream
+            async for name, text in hedged_stream(
+                (primary, partial(self.stream, primary, prompt, max_retries=0)),
+                (secondary, partial(self.stream, secondary, prompt, max_retries=0)),
+                hedge_after,
+            ):
+                if winner is None:
+                    winner = name
+                    if on_winner is not None:
+                        on_winner(name)
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            yield f"Erreur: aucun fournisseur n'a répondu ({str(e)})"
+            return
+        if winner is not None:
+            self.cache.set(cache_keys[winner], "".join(chunks))
+
+    async def _openai_chunks(self, prompt):
+        stream = await self.openai_client.chat.completions.create(
+            model=self.models["openai"],
+            temperature=self.OPENAI_TEMPERATURE,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=self.MAX_TOKENS,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _claude_chunks(self, prompt):
+        async with self.claude_client.messages.stream(
+            model=self.models["claude"],
+            max_tokens=self.MAX_TOKENS,
+            messages=[{"role": "user", "content": prompt}],
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    async def close(self):
+        await self.openai_client.close()
+        await self.claude_client.close()
@@ -0,0 +1,206 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from common.book_search import BookSearchIndex
+from common.ingredient_index import IngredientIndex
+from common.text import normalize
+
+# En-tête: signature, nombre de sections, puis (nom, nombre d'entrées, offset de l'index)
+MAGIC = b"CATMMAP1"
+_HEADER = struct.Struct("<8sI")
+_SECTION = struct.Struct("<8sQQ")
+# Entrée d'index: offset et longueur de la clé, offset et longueur de la valeur
+_ENTRY = struct.Struct("<QIQI")
+
+# ing_idx et bm25_idx: listes de postings des recherches, identifiants = rang
+# de la clé dans foods / books; meta: valeurs globales de ces index
+SECTIONS = ("foods", "books", "food_idx", "book_idx", "ing_idx", "bm25_idx", "meta")
+
+
+class MmapSection(Mapping):
+    """Section du fichier vue comme un dict en lecture seule
+
+    Les clés sont triées dans l'index: une recherche est une dichotomie
+    sur les pages mappées, et la valeur n'est décodée qu'à la lecture.
+    """
+
+    def __init__(self, buffer, count, index_offset):
+        self._buffer = buffer
+        self._count = count
+        self._index_offset = index_offset
+
+    def _entry(self, position):
+        return _ENTRY.unpack_from(
+            self._buffer, self._index_offset + position * _ENTRY.size
+        )
+
+    def _key_bytes(self, entry):
+        key_offset, key_length, _, _ = entry
+        return self._buffer[key_offset : key_offset + key_length]
+
+    def _find(self, key):
+        target = key.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            current = self._key_bytes(entry)
+            if current == target:
+                return entry
+            if current < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __getitem__(self, key):
+        entry = self._find(key) if isinstance(key, str) else None
+        if entry is None:
+            raise KeyError(key)
+        _, _, value_offset, value_length = entry
+        return json.loads(self._buffer[value_offset : value_offset + value_length])
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._find(key) is not None
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._key_bytes(self._entry(position)).decode("utf-8")
+
+    def __len__(self):
+        return self._count
+
+    def sorted_keys(self):
+        """Clés dans l'ordre de l'index, sans les charger toutes en mémoire"""
+        return MmapKeys(self)
+
+
+class MmapKeys(Sequence):
+    """Clés triées d'une section, lues par rang (dichotomie, pagination)"""
+
+    def __init__(self, section):
+        self._section = section
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        section = self._section
+        return section._key_bytes(section._entry(position)).decode("utf-8")
+
+    def __len__(self):
+        return len(self._section)
+
+
+class MmapCatalog:
+    """Catalogue mappé en mémoire, partagé par tous les processus d'une machine"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            # Le mapping reste valide même si le fichier est remplacé ensuite
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, section_count = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} n'est pas un catalogue mmap")
+
+        self.sections = {}
+        for position in range(section_count):
+            name, count, index_offset = _SECTION.unpack_from(
+                self._buffer, _HEADER.size + position * _SECTION.size
+            )
+            self.sections[name.rstrip(b"\0").decode("ascii")] = MmapSection(
+                self._buffer, count, index_offset
+            )
+
+    def close(self):
+        self._buffer.close()
+
+
+def _alias_index(foods, books):
+    """Index des noms normalisés, écrits dans le fichier pour ne pas les recalculer"""
+    food_idx = {normalize(name): name for name in foods}
+    book_idx = {normalize(book["titre"]): key for key, book in books.items()}
+    book_idx.update({normalize(key): key for key in books})
+    return food_idx, book_idx
+
+
+def _search_index(foods, books):
+    """Postings des recherches, pour que chaque worker les lise dans le mapping
+
+    Les identifiants sont les rangs des clés triées, comme dans les sections.
+    """
+    ingredients = IngredientIndex(foods)
+    search = BookSearchIndex({key: books[key] for key in sorted(books)})
+    meta = {"bm25_average_length": search.average_length}
+    return ingredients.postings, search.postings, meta
+
+
+def write_mmap_catalog(path, foods, books):
+    """Écrit un catalogue mmap puis le met en place de façon atomique"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    food_idx, book_idx = _alias_index(foods, books)
+    ing_idx, bm25_idx, meta = _search_index(foods, books)
+    sections = {
+        "foods": foods,
+        "books": books,
+        "food_idx": food_idx,
+        "book_idx": book_idx,
+        "ing_idx": ing_idx,
+        "bm25_idx": bm25_idx,
+        "meta": meta,
+    }
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            table_size = _HEADER.size + len(SECTIONS) * _SECTION.size
+            f.write(b"\0" * table_size)
+
+            # Enregistrements: clés et valeurs JSON les unes après les autres
+            entries = {}
+            for name in SECTIONS:
+                data = sections[name]
+                section_entries = []
+                for key in sorted(data, key=lambda k: k.encode("utf-8")):
+                    key_bytes = key.encode("utf-8")
+                    value_bytes = json.dumps(
+                        data[key], ensure_ascii=False, separators=(",", ":")
+                    ).encode("utf-8")
+                    key_offset = f.tell()
+                    f.write(key_bytes)
+                    value_offset = f.tell()
+                    f.write(value_bytes)
+                    section_entries.append(
+                        (key_offset, len(key_bytes), value_offset, len(value_bytes))
+                    )
+                entries[name] = section_entries
+
+            # Index à taille fixe, triés par clé, puis table des sections
+            table = [_HEADER.pack(MAGIC, len(SECTIONS))]
+            for name in SECTIONS:
+                index_offset = f.tell()
+                for entry in entries[name]:
+                    f.write(_ENTRY.pack(*entry))
+                table.append(
+                    _SECTION.pack(
+                        name.encode("ascii"), len(entries[name]), index_offset
+                    )
+                )
+            f.seek(0)
+            f.write(b"".join(table))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
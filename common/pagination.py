@@ -0,0 +1,38 @@
+import base64
+import binascii
+from bisect import bisect_right
+
+# Taille de page maximale acceptée par l'API et le serveur MCP
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible ou forgé"""
+
+
+def encode_cursor(key):
+    """Curseur opaque: la dernière clé renvoyée, encodée en base64"""
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True)
+        return raw.decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursor(f"Curseur invalide: {cursor}") from e
+
+
+def paginate(sorted_keys, cursor=None, limit=None):
+    """Renvoie (page, curseur suivant) à partir d'une liste de clés triées
+
+    Le curseur désigne une clé et non une position: une page reste
+    cohérente même si le catalogue est rechargé entre deux appels.
+    """
+    start = 0 if cursor is None else bisect_right(sorted_keys, decode_cursor(cursor))
+    if limit is None:
+        return sorted_keys[start:], None
+    page = sorted_keys[start : start + limit]
+    if start + limit < len(sorted_keys):
+        return page, encode_cursor(page[-1])
+    return page, None
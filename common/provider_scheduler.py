@@ -0,0 +1,269 @@
+import asyncio
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+
+class ProviderDeadlineExceeded(TimeoutError):
+    """La requête n'a pas pu partir (ou aboutir) avant son échéance"""
+
+
+def _remaining(deadline):
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class TokenBucket:
+    """Seau à jetons: per_minute jetons par minute, consommés dans l'ordre d'arrivée"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self, amount, deadline=None):
+        # Une demande plus grosse que le seau attend simplement qu'il soit plein
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+                if deadline is not None and now + wait > deadline:
+                    raise ProviderDeadlineExceeded("Quota du fournisseur épuisé")
+                await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """Limite de requêtes simultanées ajustée en AIMD
+
+    +1/limite à chaque succès, divisée par deux quand le fournisseur
+    répond 429 ou 5xx.
+    """
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, deadline=None):
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_flight < int(self.limit)),
+                    _remaining(deadline),
+                )
+            except asyncio.TimeoutError:
+                raise ProviderDeadlineExceeded("Trop de requêtes en cours") from None
+            self.in_flight += 1
+
+    async def release(self, throttled=False):
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class ProviderScheduler:
+    """Ordonnanceur des appels à un modèle: quotas, concurrence, reprises
+
+    Les appels attendent leur tour (quota requêtes/min et tokens/min,
+    nombre d'appels simultanés) sans dépasser leur échéance. Les erreurs
+    transitoires (429, 5xx, connexion) sont retentées avec un délai
+    aléatoire croissant, ou celui indiqué par Retry-After.
+    """
+
+    def __init__(
+        self,
+        name,
+        rpm=500,
+        tpm=200_000,
+        max_concurrency=8,
+        max_retries=4,
+        base_delay=0.5,
+        max_delay=20.0,
+        timeout=60.0,
+        retryable=(),
+    ):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        # Exceptions sans code HTTP à retenter (erreurs de connexion du SDK)
+        self.retryable = tuple(retryable)
+        # Après un 429 avec Retry-After, plus aucun appel ne part avant cette date
+        self._paused_until = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_env(cls, prefix, name, retryable=()):
+        """Lit <prefix>_RPM, _TPM, _MAX_CONCURRENCY, _MAX_RETRIES et _TIMEOUT"""
+        return cls(
+            name,
+            rpm=int(os.getenv(f"{prefix}_RPM", "500")),
+            tpm=int(os.getenv(f"{prefix}_TPM", "200000")),
+            max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "8")),
+            max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", "4")),
+            timeout=float(os.getenv(f"{prefix}_TIMEOUT", "60")),
+            retryable=retryable,
+        )
+
+    @staticmethod
+    def estimate_tokens(prompt, max_tokens):
+        """Estimation grossière: ~4 caractères par token, plus la réponse maximale"""
+        return len(prompt) // 4 + max_tokens
+
+    def _deadline(self, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        return None if timeout is None else time.monotonic() + timeout
+
+    async def _acquire(self, tokens, deadline):
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            remaining = _remaining(deadline)
+            if remaining is not None and pause > remaining:
+                raise ProviderDeadlineExceeded(f"{self.name} en pause (429)")
+            await asyncio.sleep(pause)
+        if self.requests is not None:
+            await self.requests.take(1, deadline)
+        if self.tokens is not None:
+            await self.tokens.take(tokens, deadline)
+        await self.concurrency.acquire(deadline)
+
+    def _status(self, error):
+        return getattr(error, "status_code", None)
+
+    def _is_throttle(self, error):
+        status = self._status(error)
+        return status is not None and (status == 429 or status >= 500)
+
+    def _is_retryable(self, error):
+        return self._is_throttle(error) or isinstance(error, self.retryable)
+
+    @staticmethod
+    def _retry_after(error):
+        """Délai demandé par le fournisseur (Retry-After / retry-after-ms), en s"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        if headers.get("retry-after-ms"):
+            try:
+                return float(headers["retry-after-ms"]) / 1000
+            except ValueError:
+                pass
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+
+    def _note_pause(self, error):
+        """Délai Retry-After de l'erreur; un 429 suspend aussi les appels suivants"""
+        delay = self._retry_after(error)
+        if delay is None:
+            return None
+        delay = max(0.0, delay)
+        if self._status(error) == 429:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    async def _backoff(self, error, attempt, deadline):
+        """Attend avant la reprise suivante; lève l'erreur si l'échéance est trop proche"""
+        delay = self._note_pause(error)
+        if delay is None:
+            # "Full jitter": délai aléatoire entre 0 et base * 2^tentative
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        remaining = _remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            raise error
+        self.retries += 1
+        await asyncio.sleep(delay)
+
+    async def run(self, factory, tokens=1, timeout=None, max_retries=None):
+        """Exécute await factory() selon les quotas, avec reprises
+
+        max_retries remplace, pour cet appel, le nombre de reprises par défaut.
+        """
+        deadline = self._deadline(timeout)
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            await self._acquire(tokens, deadline)
+            throttled = False
+            try:
+                return await asyncio.wait_for(factory(), _remaining(deadline))
+            except asyncio.TimeoutError:
+                raise ProviderDeadlineExceeded(f"{self.name}: délai dépassé") from None
+            except Exception as e:
+                throttled = self._is_throttle(e)
+                if not self._is_retryable(e) or attempt >= max_retries:
+                    if throttled:
+                        self._note_pause(e)
+                    raise
+                error = e
+            finally:
+                self.throttled += throttled
+                await self.concurrency.release(throttled)
+            await self._backoff(error, attempt, deadline)
+            attempt += 1
+
+    async def stream(self, factory, tokens=1, timeout=None, max_retries=None):
+        """Comme run, pour un générateur asynchrone
+
+        Une reprise n'est possible qu'avant le premier morceau: ensuite, le
+        début de la réponse a déjà été transmis.
+        """
+        deadline = self._deadline(timeout)
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            await self._acquire(tokens, deadline)
+            started = False
+            throttled = False
+            try:
+                async for chunk in factory():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                throttled = self._is_throttle(e)
+                if started or not self._is_retryable(e) or attempt >= max_retries:
+                    if throttled:
+                        self._note_pause(e)
+                    raise
+                error = e
+            finally:
+                self.throttled += throttled
+                await self.concurrency.release(throttled)
+            await self._backoff(error, attempt, deadline)
+            attempt += 1
+
+    def stats(self):
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "retries": self.retries,
+            "throttled": self.throttled,
+        }
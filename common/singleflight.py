@@ -0,0 +1,107 @@
+import asyncio
+from functools import partial
+
+
+class _StreamFlight:
+    """Flux en cours: les morceaux déjà produits sont rejoués aux nouveaux abonnés
+
+    Quand le dernier abonné s'en va avant la fin, le flux source est
+    abandonné: inutile de consommer des tokens que personne ne lira.
+    """
+
+    def __init__(self, agen):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.abandoned = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(agen))
+
+    async def _pump(self, agen):
+        try:
+            async for chunk in agen:
+                self.chunks.append(chunk)
+                self._wake()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._wake()
+            # Libère la connexion (et la place dans l'ordonnanceur) tout de suite
+            await agen.aclose()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self):
+        self.subscribers += 1
+        try:
+            position = 0
+            while True:
+                while position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                if self.done:
+                    break
+                await self._changed.wait()
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers and not self.done:
+                self.abandoned = True
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Regroupe les appels identiques simultanés sur un seul appel en cours
+
+    Le premier appelant pour une clé lance le travail; ceux qui arrivent
+    avant la fin attendent le même résultat (ou la même exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key, factory):
+        """Renvoie le résultat de factory(), partagé entre appels de même clé"""
+        task = self._calls.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: un appelant annulé n'annule pas le travail des autres
+        return await asyncio.shield(task)
+
+    async def stream(self, key, factory):
+        """Comme do, pour un générateur asynchrone: chaque abonné reçoit tout le flux"""
+        flight = self._streams.get(key)
+        if flight is None or flight.abandoned:
+            self.started += 1
+            flight = _StreamFlight(factory())
+            self._streams[key] = flight
+            flight.task.add_done_callback(partial(self._forget_stream, key, flight))
+        else:
+            self.shared += 1
+        async for chunk in flight.subscribe():
+            yield chunk
+
+    def _forget_stream(self, key, flight, _task):
+        # Un flux abandonné a pu être remplacé entre-temps pour la même clé
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "shared": self.shared,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
@@ -0,0 +1,28 @@
+import re
+import unicodedata
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    """Minuscules sans accents ni ligatures ("Pâtes" -> "pates")"""
+    text = text.casefold().replace("œ", "oe").replace("æ", "ae")
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def singular(token):
+    """Retire la marque du pluriel la plus courante en français (s, x)"""
+    if len(token) > 3 and token[-1] in "sx":
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Découpe un texte en mots normalisés: sans accents, au singulier"""
+    return [singular(token) for token in _TOKEN_RE.findall(fold(text))]
+
+
+def normalize(text):
+    """Forme canonique d'un nom, utilisée comme clé de recherche"""
+    return " ".join(tokenize(text))
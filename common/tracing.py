@@ -0,0 +1,264 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+
+# Bornes des histogrammes (s), comme les buckets Prometheus par défaut
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Histogram:
+    """Histogramme cumulatif à buckets fixes"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimation: borne supérieure du bucket qui contient le quantile
+
+        Au-delà de la dernière borne, on renvoie cette borne (un minorant):
+        l'infini n'est pas représentable en JSON.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class LogExporter:
+    """Une ligne JSON par span, sur stderr (stdout sert au protocole MCP)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def __call__(self, span):
+        print(json.dumps(span, ensure_ascii=False, default=str), file=self.stream)
+
+
+class MemoryExporter:
+    """Garde les derniers spans en mémoire (tests, affichage dans l'interface)"""
+
+    def __init__(self, maxlen=1000):
+        self.spans = deque(maxlen=maxlen)
+
+    def __call__(self, span):
+        self.spans.append(span)
+
+
+class Span:
+    """Étape chronométrée; à utiliser avec with, dans du code sync ou async"""
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.status = "ok"
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self._token = None
+        self._deferred = False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def defer(self):
+        """La sortie du with ne termine pas le span: end() ou wrap() s'en chargent"""
+        self._deferred = True
+
+    def __enter__(self):
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Span refermé dans un autre contexte (générateur repris ailleurs)
+            pass
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes.setdefault("error", repr(exc))
+        elif self._deferred:
+            return False
+        self.end()
+        return False
+
+    def end(self):
+        self.tracer.finish(self, time.perf_counter() - self._started)
+
+    async def wrap(self, agen):
+        """Relaie agen puis termine le span (différé) après le dernier morceau"""
+        try:
+            async for chunk in agen:
+                yield chunk
+        except BaseException as e:
+            self.status = "error"
+            self.set(error=repr(e))
+            raise
+        finally:
+            self.end()
+
+
+class Tracer:
+    """Spans par étape, histogrammes en mémoire et exporteurs enfichables
+
+    Un exporteur est un simple callable(dict); les histogrammes sont tenus
+    quel que soit l'exporteur, par nom de span et statut.
+    """
+
+    def __init__(self, exporters=(), buckets=DEFAULT_BUCKETS):
+        self.exporters = list(exporters)
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """TRACE_EXPORTER: none (défaut), log ou memory"""
+        exporters = {
+            "log": [LogExporter()],
+            "memory": [MemoryExporter()],
+        }.get(os.getenv("TRACE_EXPORTER", "none"), [])
+        return cls(exporters)
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def span(self, name, **attributes):
+        return Span(self, name, attributes)
+
+    def observe(self, name, seconds, status="ok"):
+        """Ajoute une mesure hors span (ex.: temps jusqu'au premier token)"""
+        key = (name, status)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def finish(self, span, duration):
+        self.observe(span.name, duration, span.status)
+        if not self.exporters:
+            return
+        record = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span.start,
+            "duration_ms": round(duration * 1000, 3),
+            "status": span.status,
+            "attributes": span.attributes,
+        }
+        for exporter in self.exporters:
+            try:
+                exporter(record)
+            except Exception as e:
+                print(f"Erreur d'exporteur de traces: {e}", file=sys.stderr)
+
+    async def stream(self, name, agen, **attributes):
+        """Relaie un flux: span sur toute sa durée, plus <name>.ttft au premier morceau"""
+        # Pas de contextvar ici: le générateur peut être repris depuis d'autres tâches
+        span = Span(self, name, attributes)
+        span.start = time.time()
+        started = time.perf_counter()
+        first = True
+        try:
+            async for chunk in agen:
+                if first:
+                    ttft = time.perf_counter() - started
+                    self.observe(f"{name}.ttft", ttft)
+                    span.set(ttft_ms=round(ttft * 1000, 3))
+                    first = False
+                yield chunk
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=repr(e))
+            raise
+        finally:
+            self.finish(span, time.perf_counter() - started)
+
+    def summary(self):
+        """{nom: {count, mean_ms, p50_ms, p95_ms}}; les percentiles sont des bornes de bucket"""
+        with self._lock:
+            items = list(self._histograms.items())
+        result = {}
+        for (name, status), histogram in sorted(items):
+            label = name if status == "ok" else f"{name} ({status})"
+            p50, p95 = histogram.quantile(0.5), histogram.quantile(0.95)
+            result[label] = {
+                "count": histogram.count,
+                "mean_ms": round(histogram.sum / histogram.count * 1000, 2),
+                "p50_ms": None if p50 is None else p50 * 1000,
+                "p95_ms": None if p95 is None else p95 * 1000,
+            }
+        return result
+
+    def render_prometheus(self, metric="span_duration_seconds"):
+        """Histogrammes au format texte Prometheus"""
+        with self._lock:
+            items = sorted(
+                (key, list(h.counts), h.sum, h.count)
+                for key, h in self._histograms.items()
+            )
+        lines = [
+            f"# HELP {metric} Durée des étapes instrumentées",
+            f"# TYPE {metric} histogram",
+        ]
+        for (name, status), counts, total, count in items:
+            labels = f'span="{_escape(name)}",status="{status}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{metric}_sum{{{labels}}} {total}")
+            lines.append(f"{metric}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Traceur du processus
+tracer = Tracer.from_env()
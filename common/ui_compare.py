@@ -0,0 +1,31 @@
+import time
+
+import streamlit as st
+
+from common.llm_providers import LABELS
+
+
+def show_measures(column, stats):
+    """Latence, délai avant premier token et tokens estimés d'un fournisseur"""
+    if stats is None:
+        return
+    ttft = "-" if stats.get("ttft_s") is None else f"{stats['ttft_s']:.2f} s"
+    tokens = f" · ~{stats['tokens']} tokens" if "tokens" in stats else ""
+    column.caption(f"Latence {stats['latence_s']:.2f} s · premier token {ttft}{tokens}")
+
+
+def render_comparison(chunks, stats):
+    """Affiche les deux réponses côte à côte, au fil des morceaux (nom, texte)"""
+    columns = dict(zip(LABELS, st.columns(2)))
+    placeholders, texts = {}, {}
+    for name, column in columns.items():
+        column.success(f"Réponse {LABELS[name]}:")
+        placeholders[name], texts[name] = column.empty(), ""
+
+    started = time.monotonic()
+    for name, text in chunks:
+        texts[name] += text
+        placeholders[name].markdown(texts[name])
+    for name, column in columns.items():
+        show_measures(column, stats.get(name))
+    st.caption(f"Temps total (données comprises): {time.monotonic() - started:.2f} s")
@@ -1,69 +1,224 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+import json
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from pydantic import BaseModel, Field
+import os
+import sys
+from pathlib import Path
+from response_cache import PreparedResponses, etag_matches
+
+# Modules partagés entre implAPI et implMCP
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.catalog import get_catalog
+from common.pagination import MAX_PAGE_SIZE, InvalidCursor, paginate
+from common.tracing import tracer
 
 app = FastAPI()
 
-# Données simples pour la démo
-FOOD_DATA = {
-    "pizza": ["farine", "tomate", "mozzarella", "huile d'olive", "basilic"],
-    "salade": ["laitue", "tomate", "concombre", "vinaigrette", "oignon"],
-    "omelette": ["œufs", "beurre", "sel", "poivre", "herbes"],
-    "pâtes": ["pâtes", "sauce tomate", "parmesan", "ail", "huile"],
-}
-
-BOOK_DATA = {
-    "1984": {
-        "titre": "1984",
-        "auteur": "George Orwell",
-        "annee": 1949,
-        "resume": "Roman dystopique sur la surveillance totalitaire",
-    },
-    "gatsby": {
-        "titre": "Gatsby le Magnifique",
-        "auteur": "F. Scott Fitzgerald",
-        "annee": 1925,
-        "resume": "Histoire tragique du rêve américain dans les années 20",
-    },
-    "hamlet": {
-        "titre": "Hamlet",
-        "auteur": "William Shakespeare",
-        "annee": 1603,
-        "resume": "Tragédie du prince du Danemark",
-    },
-}
-
-
-@app.get("/food/{food_name}")
-async def get_food_ingredients(food_name: str):
+# Taille maximale d'un lot pour les endpoints batch
+MAX_BATCH_SIZE = 500
+# Lignes NDJSON envoyées par écriture
+NDJSON_CHUNK_SIZE = 500
+
+# Durée pendant laquelle un client peut réutiliser une fiche sans revalider
+CACHE_CONTROL = f"public, max-age={int(os.getenv('API_CACHE_MAX_AGE', '30'))}"
+
+# Catalogue partagé avec le serveur MCP, rechargé à chaud
+catalog = get_catalog()
+# Fiches plat/livre déjà sérialisées, pour la version courante du catalogue
+responses = PreparedResponses()
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Un span par requête, nommé d'après la route (et non l'URL) pour borner les séries
+
+    Le span couvre l'envoi du corps: pour les réponses en flux (NDJSON), il
+    ne se termine qu'après le dernier morceau.
+    """
+    with tracer.span("api") as span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        path = route.path if route is not None else "(non routé)"
+        span.name = f"api {request.method} {path}"
+        span.set(status_code=response.status_code)
+        span.defer()
+    response.body_iterator = span.wrap(response.body_iterator)
+    return response
+
+
+def _food_data(snapshot, name):
+    key = snapshot.find_food(name)
+    if key is None:
+        return None
+    return {"plat": key, "ingredients": snapshot.foods[key]}
+
+
+def _book_data(snapshot, name):
+    key = snapshot.find_book(name)
+    if key is None:
+        return None
+    return snapshot.books[key]
+
+
+def _cached_response(request, prepared):
+    """Corps préparé, ou 304 si le client a déjà cette version"""
+    headers = {"ETag": prepared.etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), prepared.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(prepared.body, media_type="application/json", headers=headers)
+
+
+# :path: un nom peut contenir "/" (encodé %2F par le client)
+@app.get("/food/{food_name:path}")
+async def get_food_ingredients(food_name: str, request: Request):
     """API pour récupérer les ingrédients d'un plat"""
-    food_name = food_name.lower()
-    if food_name in FOOD_DATA:
-        return {"plat": food_name, "ingredients": FOOD_DATA[food_name]}
+    prepared = responses.get(catalog.snapshot(), "food", food_name, _food_data)
+    if prepared is not None:
+        return _cached_response(request, prepared)
     else:
         raise HTTPException(status_code=404, detail="Plat non trouvé")
 
 
-@app.get("/book/{book_name}")
-async def get_book_info(book_name: str):
+@app.get("/book/{book_name:path}")
+async def get_book_info(book_name: str, request: Request):
     """API pour récupérer les infos d'un livre"""
-    book_name = book_name.lower()
-    if book_name in BOOK_DATA:
-        return BOOK_DATA[book_name]
+    prepared = responses.get(catalog.snapshot(), "book", book_name, _book_data)
+    if prepared is not None:
+        return _cached_response(request, prepared)
     else:
         raise HTTPException(status_code=404, detail="Livre non trouvé")
 
 
+class BatchRequest(BaseModel):
+    names: list[str] = Field(..., max_length=MAX_BATCH_SIZE)
+
+
+@app.post("/food/batch")
+async def get_food_batch(request: BatchRequest):
+    """API pour récupérer les ingrédients de plusieurs plats en une requête"""
+    snapshot = catalog.snapshot()
+    plats = []
+    manquants = []
+    for name in request.names:
+        key = snapshot.find_food(name)
+        if key is not None:
+            plats.append({"plat": key, "ingredients": snapshot.foods[key]})
+        else:
+            manquants.append(name)
+    return {"plats": plats, "manquants": manquants}
+
+
+@app.post("/book/batch")
+async def get_book_batch(request: BatchRequest):
+    """API pour récupérer les infos de plusieurs livres en une requête"""
+    snapshot = catalog.snapshot()
+    livres = []
+    manquants = []
+    for name in request.names:
+        key = snapshot.find_book(name)
+        if key is not None:
+            livres.append(snapshot.books[key])
+        else:
+            manquants.append(name)
+    return {"livres": livres, "manquants": manquants}
+
+
+@app.get("/ingredient/{name}")
+async def get_dishes_by_ingredient(
+    name: str,
+    mode: Literal["and", "or"] = "and",
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """API pour trouver les plats à partir d'ingrédients (séparés par des virgules)"""
+    ingredients = [part.strip() for part in name.split(",") if part.strip()]
+    index = catalog.snapshot().ingredient_index
+    return {
+        "ingredients": ingredients,
+        "mode": mode,
+        "plats": index.query(ingredients, mode, limit),
+    }
+
+
+@app.get("/ingredients")
+async def list_ingredients():
+    """Liste tous les ingrédients indexés"""
+    return {
+        "ingredients_disponibles": catalog.snapshot().ingredient_index.ingredients()
+    }
+
+
+def _listing(keys, field, item_field, limit, cursor, format):
+    """Réponse paginée d'une liste de clés triées, en JSON ou en NDJSON"""
+    try:
+        page, next_cursor = paginate(keys, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+
+        def lines():
+            # Par blocs: mémoire bornée quelle que soit la taille du catalogue
+            for start in range(0, len(page), NDJSON_CHUNK_SIZE):
+                yield "".join(
+                    json.dumps({item_field: key}, ensure_ascii=False) + "\n"
+                    for key in page[start : start + NDJSON_CHUNK_SIZE]
+                )
+            if next_cursor is not None:
+                yield json.dumps({"next_cursor": next_cursor}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return {field: page, "next_cursor": next_cursor}
+
+
 @app.get("/foods")
-async def list_foods():
-    """Liste tous les plats disponibles"""
-    return {"plats_disponibles": list(FOOD_DATA.keys())}
+async def list_foods(
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    format: Literal["json", "ndjson"] = "json",
+):
+    """Liste les plats disponibles (tous, ou par pages avec limit et cursor)"""
+    keys = catalog.snapshot().food_keys
+    return _listing(keys, "plats_disponibles", "plat", limit, cursor, format)
+
+
+@app.get("/books/search")
+async def search_books(q: str, k: int = Query(5, ge=1, le=50)):
+    """Recherche plein texte (titre, auteur, résumé) dans les livres"""
+    snapshot = catalog.snapshot()
+    return {
+        "requete": q,
+        "resultats": [
+            {"livre": key, "score": score, **snapshot.books[key]}
+            for key, score in snapshot.book_search.search(q, k)
+        ],
+    }
 
 
 @app.get("/books")
-async def list_books():
-    """Liste tous les livres disponibles"""
-    return {"livres_disponibles": list(BOOK_DATA.keys())}
+async def list_books(
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    format: Literal["json", "ndjson"] = "json",
+):
+    """Liste les livres disponibles (tous, ou par pages avec limit et cursor)"""
+    keys = catalog.snapshot().book_keys
+    return _listing(keys, "livres_disponibles", "livre", limit, cursor, format)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Histogrammes de latence au format texte Prometheus"""
+    return PlainTextResponse(
+        tracer.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+import httpx
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class ApiClient:
+    """Client HTTP asynchrone partagé vers l'API, avec pool de connexions keep-alive
+
+    Les réponses GET portant un ETag sont gardées en cache: réutilisées
+    telles quelles pendant leur max-age, puis revalidées (If-None-Match).
+    """
+
+    def __init__(
+        self,
+        base_url,
+        pool_size=10,
+        timeout=5.0,
+        connect_timeout=2.0,
+        cache_size=1024,
+    ):
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=30.0,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._async_client = None
+        self._lock = threading.Lock()
+        self.cache_size = cache_size
+        # URL -> (réponse, expiration)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def async_client(self):
+        """Client asynchrone, lié à la boucle asyncio qui l'utilise en premier"""
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = httpx.AsyncClient(
+                        base_url=self.base_url, limits=self.limits, timeout=self.timeout
+                    )
+        return self._async_client
+
+    async def request(self, method, path, **kwargs):
+        if method != "GET":
+            return await self.async_client.request(method, path, **kwargs)
+        request = self.async_client.build_request(method, path, **kwargs)
+        fresh, stale = self._lookup(request)
+        if fresh is not None:
+            return fresh
+        return self._store(request, await self.async_client.send(request), stale)
+
+    def _lookup(self, request):
+        """(réponse fraîche, réponse à revalider) trouvées en cache pour la requête"""
+        key = str(request.url)
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None, None
+            self._cache.move_to_end(key)
+        response, expires_at = entry
+        if time.monotonic() < expires_at:
+            return response, None
+        request.headers["If-None-Match"] = response.headers["ETag"]
+        return None, response
+
+    def _store(self, request, response, stale):
+        """Met en cache une réponse, ou renvoie l'ancienne sur un 304"""
+        if response.status_code == 304 and stale is not None:
+            response = stale
+        elif response.status_code != 200 or "ETag" not in response.headers:
+            return response
+
+        match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        expires_at = time.monotonic() + (int(match.group(1)) if match else 0)
+        key = str(request.url)
+        with self._cache_lock:
+            self._cache[key] = (response, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return response
+
+    async def close(self):
+        """Ferme le client asynchrone et ses connexions"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
@@ -1,139 +1,299 @@
-import requests
-import openai
-from anthropic import Anthropic
+import asyncio
+import json
+import time
+from functools import partial
+from api_client import ApiClient
 import os
+import sys
+from pathlib import Path
+from urllib.parse import quote
+
+# Modules partagés entre implAPI et implMCP
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.completion_cache import CompletionCache
+from common.entity_matcher import EntityMatcher
+from common.llm_providers import LLMProviders
+from common.singleflight import SingleFlight
+from common.tracing import tracer
 
 
 class LLMService:
-    def __init__(self):
-        # Tu devras mettre tes vraies clés API ici
-        self.openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.claude_client = Anthropic(api_key="")
-        self.api_base_url = "http://localhost:8000"
+    OPENAI_MODEL = "gpt-4o-mini"
+    CLAUDE_MODEL = "claude-3-sonnet-20240229"
+    # Durée de vie du matcher avant de relire le catalogue
+    MATCHER_TTL = 300.0
+    # Nombre d'éléments d'une liste insérés dans le prompt
+    LISTING_LIMIT = 50
+
+    def __init__(
+        self,
+        api_base_url=None,
+        pool_size=None,
+        timeout=None,
+        cache=None,
+        openai_base_url=None,
+        claude_base_url=None,
+    ):
+        self.api_base_url = api_base_url or os.getenv(
+            "API_BASE_URL", "http://localhost:8000"
+        )
+        # Client HTTP partagé: les connexions restent ouvertes entre deux appels
+        self.http = ApiClient(
+            self.api_base_url,
+            pool_size=pool_size or int(os.getenv("API_POOL_SIZE", "10")),
+            timeout=timeout or float(os.getenv("API_TIMEOUT", "5")),
+        )
+        # Cache des complétions: les questions répétées ne repassent pas par le LLM
+        self.cache = cache or CompletionCache.from_env()
+        # Appels fournisseur identiques en cours, partagés entre utilisateurs
+        self.flights = SingleFlight()
+        # Clients OpenAI/Claude, quotas et reprises (communs avec l'autre service)
+        self.providers = LLMProviders(
+            self.OPENAI_MODEL,
+            self.CLAUDE_MODEL,
+            self.cache,
+            self.flights,
+            openai_base_url=openai_base_url,
+            claude_base_url=claude_base_url,
+        )
+        self.matcher = None
+        self._matcher_built_at = 0.0
+        self._matcher_lock = asyncio.Lock()
+
+    async def _call_api(self, method, path, error, **kwargs):
+        """Appelle l'API et renvoie le JSON, ou un dict d'erreur"""
+        if method == "GET":
+            # Lectures identiques en cours: une seule requête HTTP
+            key = (path, json.dumps(kwargs.get("params"), sort_keys=True))
+            return await self.flights.do(
+                key, partial(self._request_api, method, path, error, **kwargs)
+            )
+        return await self._request_api(method, path, error, **kwargs)
 
-    def call_food_api(self, food_name):
+    async def _request_api(self, method, path, error, **kwargs):
+        with tracer.span("tool.http", method=method, path=path) as span:
+            try:
+                response = await self.http.request(method, path, **kwargs)
+                span.set(status_code=response.status_code)
+                if response.status_code == 200:
+                    return response.json()
+                else:
+                    return {"error": error}
+            except Exception as e:
+                span.status = "error"
+                return {"error": f"Erreur API: {str(e)}"}
+
+    async def call_food_api(self, food_name):
         """Appelle l'API nourriture"""
-        try:
-            response = requests.get(f"{self.api_base_url}/food/{food_name}")
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {"error": "Plat non trouvé"}
-        except Exception as e:
-            return {"error": f"Erreur API: {str(e)}"}
-
-    def call_book_api(self, book_name):
+        return await self._call_api(
+            "GET", f"/food/{quote(food_name, safe='')}", "Plat non trouvé"
+        )
+
+    async def call_book_api(self, book_name):
         """Appelle l'API livre"""
-        try:
-            response = requests.get(f"{self.api_base_url}/book/{book_name}")
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {"error": "Livre non trouvé"}
-        except Exception as e:
-            return {"error": f"Erreur API: {str(e)}"}
-
-    def process_with_openai(self, user_query):
-        """Traite la requête avec OpenAI"""
-        # Détermine si c'est une question sur la nourriture ou les livres
-        if any(
-            word in user_query.lower()
-            for word in ["ingrédient", "plat", "nourriture", "recette"]
-        ):
-            # Extrait le nom du plat (logique simple)
-            food_name = self._extract_food_name(user_query)
-            api_result = self.call_food_api(food_name)
-
-            prompt = f"""
-            L'utilisateur demande: {user_query}
-            
-            Données de l'API: {api_result}
-            
-            Réponds de manière naturelle en utilisant ces données.
-            """
-        elif any(
-            word in user_query.lower()
-            for word in ["livre", "auteur", "roman", "histoire"]
-        ):
-            book_name = self._extract_book_name(user_query)
-            api_result = self.call_book_api(book_name)
-
-            prompt = f"""
-            L'utilisateur demande: {user_query}
-            
-            Données de l'API: {api_result}
-            
-            Réponds de manière naturelle en utilisant ces données.
-            """
-        else:
-            prompt = f"Réponds à cette question: {user_query}"
-
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                temperature=0.2,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300,
+        return await self._call_api(
+            "GET", f"/book/{quote(book_name, safe='')}", "Livre non trouvé"
+        )
+
+    async def call_food_api_batch(self, food_names):
+        """Appelle l'API nourriture pour plusieurs plats en une seule requête"""
+        return await self._call_api(
+            "POST", "/food/batch", "Erreur API batch", json={"names": list(food_names)}
+        )
+
+    async def call_book_api_batch(self, book_names):
+        """Appelle l'API livre pour plusieurs livres en une seule requête"""
+        return await self._call_api(
+            "POST", "/book/batch", "Erreur API batch", json={"names": list(book_names)}
+        )
+
+    async def list_foods(self, limit=None, cursor=None):
+        """Liste les plats disponibles (une page si limit est donné)"""
+        return await self._call_api(
+            "GET",
+            "/foods",
+            "Liste des plats indisponible",
+            params=self._page_params(limit, cursor),
+        )
+
+    async def list_books(self, limit=None, cursor=None):
+        """Liste les livres disponibles (une page si limit est donné)"""
+        return await self._call_api(
+            "GET",
+            "/books",
+            "Liste des livres indisponible",
+            params=self._page_params(limit, cursor),
+        )
+
+    @staticmethod
+    def _page_params(limit, cursor):
+        params = {}
+        if limit is not None:
+            params["limit"] = limit
+        if cursor is not None:
+            params["cursor"] = cursor
+        return params
+
+    async def _list_all(self, list_page, field, page_size=1000):
+        """Parcourt toutes les pages d'une liste; None en cas d'erreur"""
+        items = []
+        cursor = None
+        while True:
+            data = await list_page(limit=page_size, cursor=cursor)
+            if "error" in data:
+                return None
+            items.extend(data[field])
+            cursor = data.get("next_cursor")
+            if cursor is None:
+                return items
+
+    async def list_ingredients(self):
+        """Liste les ingrédients connus"""
+        return await self._call_api(
+            "GET", "/ingredients", "Liste des ingrédients indisponible"
+        )
+
+    async def find_dishes_by_ingredients(self, ingredients, mode="and"):
+        """Recherche inverse: plats contenant ces ingrédients"""
+        names = quote(",".join(ingredients), safe=",")
+        return await self._call_api(
+            "GET", f"/ingredient/{names}", "Recherche impossible", params={"mode": mode}
+        )
+
+    async def search_books(self, query, k=5):
+        """Recherche plein texte dans les livres"""
+        return await self._call_api(
+            "GET",
+            "/books/search",
+            "Recherche impossible",
+            params={"q": query, "k": k},
+        )
+
+    async def close(self):
+        """Ferme les clients HTTP et fournisseurs"""
+        await self.http.close()
+        await self.providers.close()
+
+    def _matcher_is_fresh(self):
+        return (
+            self.matcher is not None
+            and time.monotonic() - self._matcher_built_at < self.MATCHER_TTL
+        )
+
+    async def _get_matcher(self):
+        """Matcher d'entités construit sur le catalogue actuel de l'API"""
+        if self._matcher_is_fresh():
+            return self.matcher
+
+        async with self._matcher_lock:
+            if self._matcher_is_fresh():
+                return self.matcher
+            # Les listes sont paginées: on lit toutes les pages
+            foods, books, ingredients = await asyncio.gather(
+                self._list_all(self.list_foods, "plats_disponibles"),
+                self._list_all(self.list_books, "livres_disponibles"),
+                self.list_ingredients(),
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Erreur OpenAI: {str(e)}"
+            if foods is None or books is None or "error" in ingredients:
+                # API indisponible: on garde l'ancien matcher s'il existe
+                return self.matcher or EntityMatcher.from_catalog()
+            self.matcher = EntityMatcher.from_catalog(
+                foods, books, ingredients["ingredients_disponibles"]
+            )
+            self._matcher_built_at = time.monotonic()
+            return self.matcher
 
-    def process_with_claude(self, user_query):
-        """Traite la requête avec Claude"""
-        if any(
-            word in user_query.lower()
-            for word in ["ingrédient", "plat", "nourriture", "recette"]
-        ):
-            food_name = self._extract_food_name(user_query)
-            api_result = self.call_food_api(food_name)
-
-            prompt = f"""
-            L'utilisateur demande: {user_query}
-            
-            Données de l'API: {api_result}
-            
-            Réponds de manière naturelle en utilisant ces données.
-            """
-        elif any(
-            word in user_query.lower()
-            for word in ["livre", "auteur", "roman", "histoire"]
-        ):
-            book_name = self._extract_book_name(user_query)
-            api_result = self.call_book_api(book_name)
-
-            prompt = f"""
+    async def _build_prompt(self, user_query):
+        """Récupère les données utiles et construit le prompt"""
+        with tracer.span("prompt.build"):
+            return await self._assemble_prompt(user_query)
+
+    async def _assemble_prompt(self, user_query):
+        # Un seul passage sur la requête: noms du catalogue et intentions
+        matcher = await self._get_matcher()
+        with tracer.span("route") as span:
+            entities = matcher.analyze(user_query)
+            span.set(intent=entities["intent"])
+        foods, books = entities["food"], entities["book"]
+
+        lookups = []
+        if entities["ingredient"] and "reverse" in entities["intent"]:
+            # "Que cuisiner avec ..." : recherche inverse par ingrédients
+            mode = "or" if " ou " in f" {user_query.lower()} " else "and"
+            lookups.append(
+                self.find_dishes_by_ingredients(entities["ingredient"], mode)
+            )
+        elif len(foods) == 1:
+            lookups.append(self.call_food_api(foods[0]))
+        elif foods:
+            lookups.append(self.call_food_api_batch(foods))
+        if len(books) == 1:
+            lookups.append(self.call_book_api(books[0]))
+        elif books:
+            lookups.append(self.call_book_api_batch(books))
+
+        if not lookups:
+            # Intention sans nom reconnu: on fournit la liste disponible
+            if "food" in entities["intent"]:
+                lookups.append(self.list_foods(limit=self.LISTING_LIMIT))
+            if "book" in entities["intent"]:
+                # Livre désigné par son thème ou son auteur
+                lookups.append(self.search_books(user_query))
+
+        if not lookups:
+            return f"Réponds à cette question: {user_query}"
+
+        # Les appels API indépendants partent en parallèle
+        results = await asyncio.gather(*lookups)
+        api_result = results[0] if len(results) == 1 else list(results)
+
+        return f"""
             L'utilisateur demande: {user_query}
             
             Données de l'API: {api_result}
             
             Réponds de manière naturelle en utilisant ces données.
             """
-        else:
-            prompt = f"Réponds à cette question: {user_query}"
-
-        try:
-            response = self.claude_client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=300,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            return response.content[0].text
-        except Exception as e:
-            return f"Erreur Claude: {str(e)}"
-
-    def _extract_food_name(self, query):
-        """Extrait le nom du plat de la requête (logique simple)"""
-        foods = ["pizza", "salade", "omelette", "pâtes"]
-        for food in foods:
-            if food in query.lower():
-                return food
-        return "pizza"  # Par défaut
-
-    def _extract_book_name(self, query):
-        """Extrait le nom du livre de la requête (logique simple)"""
-        books = ["1984", "gatsby", "hamlet"]
-        for book in books:
-            if book in query.lower():
-                return book
-        return "1984"  # Par défaut
+
+    async def process_with_openai(self, user_query):
+        """Traite la requête avec OpenAI"""
+        prompt = await self._build_prompt(user_query)
+
+        return await self.providers.answer("openai", prompt)
+
+    async def process_with_claude(self, user_query):
+        """Traite la requête avec Claude"""
+        prompt = await self._build_prompt(user_query)
+
+        return await self.providers.answer("claude", prompt)
+
+    async def stream_with_openai(self, user_query):
+        """Comme process_with_openai, mais produit la réponse morceau par morceau"""
+        prompt = await self._build_prompt(user_query)
+
+        async for text in self.providers.cached_stream("openai", prompt):
+            yield text
+
+    async def stream_with_claude(self, user_query):
+        """Comme process_with_claude, mais produit la réponse morceau par morceau"""
+        prompt = await self._build_prompt(user_query)
+
+        async for text in self.providers.cached_stream("claude", prompt):
+            yield text
+
+    async def stream_compare(self, user_query, on_done=None):
+        """OpenAI et Claude en parallèle sur le même prompt (voir LLMProviders)
+
+        Les données ne sont récupérées qu'une fois.
+        """
+        prompt = await self._build_prompt(user_query)
+
+        async for name, text in self.providers.stream_compare(prompt, on_done):
+            yield name, text
+
+    async def stream_fastest(self, user_query, on_winner=None):
+        """Réponse du fournisseur le plus rapide, morceau par morceau (voir LLMProviders)"""
+        prompt = await self._build_prompt(user_query)
+
+        async for text in self.providers.stream_fastest(prompt, on_winner):
+            yield text
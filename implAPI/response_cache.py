@@ -0,0 +1,80 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+# orjson (optionnel) sérialise beaucoup plus vite que json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+Prepared = namedtuple("Prepared", ["body", "etag"])
+
+
+def dumps(data):
+    """Sérialise en JSON UTF-8 (bytes)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def prepare(data):
+    """Corps sérialisé et ETag fort (empreinte du contenu)"""
+    body = dumps(data)
+    return Prepared(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+def etag_matches(if_none_match, etag):
+    """Vrai si l'en-tête If-None-Match désigne déjà etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparaison faible (RFC 9110): le préfixe W/ est ignoré
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+class PreparedResponses:
+    """Réponses sérialisées par entité, valables pour une version du catalogue
+
+    Chaque nom trouvé est résolu et sérialisé une seule fois; les appels
+    suivants ne font qu'une lecture de dict. Au-delà de max_entries, les
+    réponses les moins récemment demandées sont oubliées. Tout est oublié
+    au rechargement.
+    """
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, snapshot, kind, name, build):
+        """Réponse préparée pour (kind, name); build(snapshot, name) -> données ou None"""
+        cache_key = (kind, name)
+        with self._lock:
+            if self._version != snapshot.version:
+                self._entries = OrderedDict()
+                self._version = snapshot.version
+            entries = self._entries
+            prepared = entries.get(cache_key)
+            if prepared is not None:
+                entries.move_to_end(cache_key)
+                return prepared
+
+        data = build(snapshot, name)
+        if data is None:
+            # Entité inconnue: pas mémorisée, des noms au hasard ne doivent
+            # pas chasser les réponses préparées
+            return None
+        prepared = prepare(data)
+        with self._lock:
+            # Rechargé entre-temps: la réponse vaut pour l'ancienne version
+            if self._version == snapshot.version:
+                entries[cache_key] = prepared
+                entries.move_to_end(cache_key)
+                while len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+        return prepared
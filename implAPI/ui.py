@@ -1,5 +1,8 @@
 import streamlit as st
 from llm import LLMService
+from common.event_loop import BackgroundEventLoop
+from common.tracing import tracer
+from common.ui_compare import render_comparison
 
 # Configuration de la page
 st.set_page_config(page_title="Demo API vs MCP", page_icon="🤖", layout="wide")
@@ -7,14 +10,39 @@ st.set_page_config(page_title="Demo API vs MCP", page_icon="🤖", layout="wide"
 st.title("Demo: LLM avec APIs")
 
 
+# Boucle asyncio persistante: les clients async du service y restent liés
+@st.cache_resource
+def get_background_loop():
+    """Boucle asyncio du processus, dans un thread d'arrière-plan, partagée par les sessions"""
+    return BackgroundEventLoop(name="llm-loop")
+
+
+def run_async(coro, timeout=None):
+    """Exécute une coroutine sur la boucle persistante et attend son résultat"""
+    return get_background_loop().run(coro, timeout)
+
+
+def stream_async(agen):
+    """Parcourt un générateur asynchrone depuis le script, morceau par morceau"""
+    return get_background_loop().stream(agen)
+
+
 # Initialise le service LLM
 @st.cache_resource
 def init_llm_service():
-    return LLMService()
+    service = LLMService()
+    # Arrêt du processus: clients HTTP et fournisseurs fermés sur leur boucle
+    get_background_loop().on_shutdown(service.close)
+    return service
 
 
 llm_service = init_llm_service()
 
+st.sidebar.subheader("Cache des réponses")
+st.sidebar.json(llm_service.cache.stats())
+with st.sidebar.expander("Latences par étape"):
+    st.json(tracer.summary())
+
 # Interface utilisateur
 col1, col2 = st.columns(2)
 
@@ -35,24 +63,52 @@ user_query = st.text_input(
 )
 
 # Boutons pour choisir le modèle
-col1, col2 = st.columns(2)
+col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     if st.button("🟢 OpenAI", use_container_width=True):
         if user_query:
-            with st.spinner("OpenAI réfléchit..."):
-                response = llm_service.process_with_openai(user_query)
-                st.success("Réponse OpenAI:")
-                st.write(response)
+            st.success("Réponse OpenAI:")
+            st.write_stream(stream_async(llm_service.stream_with_openai(user_query)))
         else:
             st.warning("Tape une question d'abord!")
 
 with col2:
     if st.button("🔵 Claude", use_container_width=True):
         if user_query:
-            with st.spinner("Claude réfléchit..."):
-                response = llm_service.process_with_claude(user_query)
-                st.success("Réponse Claude:")
-                st.write(response)
+            st.success("Réponse Claude:")
+            st.write_stream(stream_async(llm_service.stream_with_claude(user_query)))
         else:
             st.warning("Tape une question d'abord!")
+
+with col3:
+    if st.button("⚡ Le plus rapide", use_container_width=True):
+        if user_query:
+            # Le fournisseur retenu n'est connu qu'au premier token
+            winner = []
+            st.success("Réponse la plus rapide:")
+            st.write_stream(
+                stream_async(
+                    llm_service.stream_fastest(user_query, on_winner=winner.append)
+                )
+            )
+            if winner:
+                st.caption(f"Répondu par {winner[0]}")
+        else:
+            st.warning("Tape une question d'abord!")
+
+with col4:
+    compare = st.button("⚖️ Comparer", use_container_width=True)
+
+if compare:
+    if user_query:
+        # Données récupérées une fois, puis les deux fournisseurs en parallèle
+        stats = {}
+        render_comparison(
+            stream_async(
+                llm_service.stream_compare(user_query, on_done=stats.__setitem__)
+            ),
+            stats,
+        )
+    else:
+        st.warning("Tape une question d'abord!")
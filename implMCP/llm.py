@@ -1,17 +1,85 @@
 import asyncio
-import openai
-from anthropic import Anthropic
+import json
+import time
+from contextlib import asynccontextmanager
 from mcp_client import MCPClient
-import os
+import sys
+from pathlib import Path
+
+# Modules partagés entre implAPI et implMCP
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.completion_cache import CompletionCache
+from common.entity_matcher import EntityMatcher
+from common.llm_providers import LABELS, LLMProviders
+from common.singleflight import SingleFlight
+from common.tracing import tracer
+
+TOOLS_SYSTEM_PROMPT = (
+    "Tu réponds aux questions sur des plats et des livres. "
+    "Utilise les outils disponibles pour récupérer les données nécessaires, "
+    "en appelant plusieurs outils à la fois si besoin, puis réponds de manière "
+    "naturelle. Si un outil renvoie une erreur, explique-le gentiment."
+)
+
+
+def to_openai_tools(tools):
+    """Convertit les outils MCP en définitions de fonctions OpenAI"""
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description or "",
+                "parameters": tool.inputSchema,
+            },
+        }
+        for tool in tools
+    ]
+
+
+def to_anthropic_tools(tools):
+    """Convertit les outils MCP en définitions d'outils Anthropic"""
+    return [
+        {
+            "name": tool.name,
+            "description": tool.description or "",
+            "input_schema": tool.inputSchema,
+        }
+        for tool in tools
+    ]
 
 
 class MCPLLMService:
-    def __init__(self):
-        # Tu devras mettre tes vraies clés API ici
-        self.openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.claude_client = Anthropic(api_key="")
+    OPENAI_MODEL = "gpt-4o-mini"
+    CLAUDE_MODEL = "claude-3-haiku-20240307"
+    # Durée de vie du matcher avant de relire le catalogue
+    MATCHER_TTL = 300.0
+    # Nombre d'éléments d'une liste insérés dans le prompt
+    LISTING_LIMIT = 50
+
+    def __init__(
+        self, pool=None, cache=None, openai_base_url=None, claude_base_url=None
+    ):
+        # Pool partagé de clients MCP (optionnel), sinon connexion dédiée
+        self.pool = pool
+        # Cache des complétions, à partager entre instances via le paramètre cache
+        self.cache = cache or CompletionCache.from_env()
+        # Appels fournisseur identiques en cours, partagés entre utilisateurs
+        self.flights = SingleFlight()
+        # Clients OpenAI/Claude, quotas et reprises (communs avec l'autre service)
+        self.providers = LLMProviders(
+            self.OPENAI_MODEL,
+            self.CLAUDE_MODEL,
+            self.cache,
+            self.flights,
+            openai_base_url=openai_base_url,
+            claude_base_url=claude_base_url,
+        )
         self.mcp_client = None
         self._connection_lock = asyncio.Lock()
+        self.matcher = None
+        self._matcher_built_at = 0.0
+        self._matcher_lock = asyncio.Lock()
 
     async def __aenter__(self):
         """Context manager entry"""
@@ -51,18 +119,35 @@ class MCPLLMService:
             await self.init_mcp()
         return self.mcp_client and self.mcp_client.connected
 
-    async def process_with_openai(self, user_query):
-        """Traite la requête avec OpenAI en utilisant MCP"""
-        print(f"Use function process_with_openai")
+    @asynccontextmanager
+    async def _borrow_client(self):
+        """Fournit un client emprunté au pool, ou la connexion dédiée"""
+        if self.pool is not None:
+            async with self.pool.acquire() as client:
+                yield client
+            return
 
-        # S'assurer que MCP est connecté
         if not await self.ensure_mcp_connection():
-            return "Erreur: Impossible de se connecter au serveur MCP"
+            raise ConnectionError("Impossible de se connecter au serveur MCP")
+        yield self.mcp_client
 
+    async def _fetch_mcp_data(self, user_query):
+        """Récupère les données via un client emprunté au pool ou la connexion dédiée"""
+        async with self._borrow_client() as client:
+            return await self._get_mcp_data(user_query, client)
+
+    async def _build_prompt(self, user_query):
+        """Récupère les données MCP et construit le prompt
+
+        Renvoie (prompt, None), ou (None, message d'erreur) si MCP échoue.
+        """
         try:
-            mcp_data = await self._get_mcp_data(user_query)
+            with tracer.span("prompt.build"):
+                mcp_data = await self._fetch_mcp_data(user_query)
+        except ConnectionError as e:
+            return None, f"Erreur: {str(e)}"
         except Exception as e:
-            return f"Erreur lors de la récupération des données MCP: {str(e)}"
+            return None, f"Erreur lors de la récupération des données MCP: {str(e)}"
 
         prompt = f"""
         L'utilisateur demande: {user_query}
@@ -72,94 +157,260 @@ class MCPLLMService:
         Réponds de manière naturelle en utilisant ces données.
         Si il y a une erreur dans les données, explique-le gentiment.
         """
+        return prompt, None
 
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                temperature=0.2,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300,
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Erreur OpenAI: {str(e)}"
+    async def process_with_openai(self, user_query):
+        """Traite la requête avec OpenAI en utilisant MCP"""
+        prompt, error = await self._build_prompt(user_query)
+        if error:
+            return error
+
+        return await self.providers.answer("openai", prompt)
 
     async def process_with_claude(self, user_query):
         """Traite la requête avec Claude en utilisant MCP"""
-        # S'assurer que MCP est connecté
-        if not await self.ensure_mcp_connection():
-            return "Erreur: Impossible de se connecter au serveur MCP"
+        prompt, error = await self._build_prompt(user_query)
+        if error:
+            return error
 
-        try:
-            mcp_data = await self._get_mcp_data(user_query)
-        except Exception as e:
-            return f"Erreur lors de la récupération des données MCP: {str(e)}"
+        return await self.providers.answer("claude", prompt)
 
-        prompt = f"""
-        L'utilisateur demande: {user_query}
-        
-        Données récupérées via MCP: {mcp_data}
-        
-        Réponds de manière naturelle en utilisant ces données.
-        Si il y a une erreur dans les données, explique-le gentiment.
+    async def stream_with_openai(self, user_query):
+        """Comme process_with_openai, mais produit la réponse morceau par morceau"""
+        prompt, error = await self._build_prompt(user_query)
+        if error:
+            yield error
+            return
+
+        async for text in self.providers.cached_stream("openai", prompt):
+            yield text
+
+    async def stream_with_claude(self, user_query):
+        """Comme process_with_claude, mais produit la réponse morceau par morceau"""
+        prompt, error = await self._build_prompt(user_query)
+        if error:
+            yield error
+            return
+
+        async for text in self.providers.cached_stream("claude", prompt):
+            yield text
+
+    async def stream_compare(self, user_query, on_done=None):
+        """OpenAI et Claude en parallèle sur le même prompt (voir LLMProviders)
+
+        Les données ne sont récupérées qu'une fois.
         """
+        prompt, error = await self._build_prompt(user_query)
+        if error:
+            for name in LABELS:
+                yield name, error
+            return
 
+        async for name, text in self.providers.stream_compare(prompt, on_done):
+            yield name, text
+
+    async def stream_fastest(self, user_query, on_winner=None):
+        """Réponse du fournisseur le plus rapide, morceau par morceau (voir LLMProviders)"""
+        prompt, error = await self._build_prompt(user_query)
+        if error:
+            yield error
+            return
+
+        async for text in self.providers.stream_fastest(prompt, on_winner):
+            yield text
+
+    async def process_with_openai_tools(self, user_query, max_rounds=5):
+        """Laisse OpenAI choisir les outils MCP à appeler (function calling)"""
         try:
-            response = self.claude_client.messages.create(
-                model="claude-3-haiku-20240307",  # Modèle valide
-                max_tokens=300,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            return response.content[0].text
+            async with self._borrow_client() as client:
+                return await self._openai_tool_loop(client, user_query, max_rounds)
+        except ConnectionError as e:
+            return f"Erreur: {str(e)}"
+        except Exception as e:
+            return f"Erreur OpenAI: {str(e)}"
+
+    async def process_with_claude_tools(self, user_query, max_rounds=5):
+        """Laisse Claude choisir les outils MCP à appeler (tool use)"""
+        try:
+            async with self._borrow_client() as client:
+                return await self._claude_tool_loop(client, user_query, max_rounds)
+        except ConnectionError as e:
+            return f"Erreur: {str(e)}"
         except Exception as e:
             return f"Erreur Claude: {str(e)}"
 
-    async def _get_mcp_data(self, query):
+    async def _openai_tool_loop(self, client, user_query, max_rounds):
+        tools = to_openai_tools(client.tools)
+        messages = [
+            {"role": "system", "content": TOOLS_SYSTEM_PROMPT},
+            {"role": "user", "content": user_query},
+        ]
+
+        for _ in range(max_rounds):
+            with tracer.span("provider.openai.tools"):
+                response = await self.providers.create("openai", messages, tools=tools)
+            message = response.choices[0].message
+            if not message.tool_calls:
+                return message.content
+
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": message.content,
+                    "tool_calls": [call.model_dump() for call in message.tool_calls],
+                }
+            )
+            # Les appels d'un même tour partent en parallèle sur la session MCP
+            results = await client.call_many(
+                [
+                    (call.function.name, self._parse_arguments(call.function.arguments))
+                    for call in message.tool_calls
+                ]
+            )
+            for call, result in zip(message.tool_calls, results):
+                messages.append(
+                    {
+                        "role": "tool",
+                        "tool_call_id": call.id,
+                        "content": json.dumps(result["result"], ensure_ascii=False),
+                    }
+                )
+
+        return "Erreur: trop d'appels d'outils sans réponse finale"
+
+    async def _claude_tool_loop(self, client, user_query, max_rounds):
+        tools = to_anthropic_tools(client.tools)
+        messages = [{"role": "user", "content": user_query}]
+
+        for _ in range(max_rounds):
+            with tracer.span("provider.claude.tools"):
+                response = await self.providers.create(
+                    "claude", messages, system=TOOLS_SYSTEM_PROMPT, tools=tools
+                )
+            tool_uses = [
+                block for block in response.content if block.type == "tool_use"
+            ]
+            if response.stop_reason != "tool_use" or not tool_uses:
+                return "".join(
+                    block.text for block in response.content if block.type == "text"
+                )
+
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": [
+                        block.model_dump(exclude_none=True)
+                        for block in response.content
+                    ],
+                }
+            )
+            # Les appels d'un même tour partent en parallèle sur la session MCP
+            results = await client.call_many(
+                [(block.name, block.input) for block in tool_uses]
+            )
+            messages.append(
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "tool_result",
+                            "tool_use_id": block.id,
+                            "content": json.dumps(result["result"], ensure_ascii=False),
+                            "is_error": not result["ok"],
+                        }
+                        for block, result in zip(tool_uses, results)
+                    ],
+                }
+            )
+
+        return "Erreur: trop d'appels d'outils sans réponse finale"
+
+    @staticmethod
+    def _parse_arguments(arguments):
+        """Décode les arguments JSON d'un appel de fonction OpenAI"""
+        try:
+            return json.loads(arguments or "{}")
+        except json.JSONDecodeError:
+            return {}
+
+    def _matcher_is_fresh(self):
+        return (
+            self.matcher is not None
+            and time.monotonic() - self._matcher_built_at < self.MATCHER_TTL
+        )
+
+    async def _get_matcher(self, client):
+        """Matcher d'entités construit sur le catalogue actuel du serveur MCP"""
+        if self._matcher_is_fresh():
+            return self.matcher
+
+        async with self._matcher_lock:
+            if self._matcher_is_fresh():
+                return self.matcher
+            # Les listes sont paginées: on lit toutes les pages
+            foods, books, ingredients = await asyncio.gather(
+                client.list_all("list_available_foods", "plats_disponibles"),
+                client.list_all("list_available_books", "livres_disponibles"),
+                client.list_ingredients(),
+            )
+            if foods is None or books is None or "error" in ingredients:
+                # Serveur indisponible: on garde l'ancien matcher s'il existe
+                return self.matcher or EntityMatcher.from_catalog()
+            self.matcher = EntityMatcher.from_catalog(
+                foods, books, ingredients["ingredients_disponibles"]
+            )
+            self._matcher_built_at = time.monotonic()
+            return self.matcher
+
+    async def _get_mcp_data(self, query, client=None):
         """Récupère les données via MCP selon le type de requête"""
-        if not self.mcp_client or not self.mcp_client.connected:
+        client = client or self.mcp_client
+        if not client or not client.connected:
             return {"error": "MCP non connecté"}
 
-        query_lower = query.lower()
-
         try:
-            if any(
-                word in query_lower
-                for word in ["ingrédient", "plat", "nourriture", "recette"]
-            ):
-                # Question sur la nourriture
-                food_name = self._extract_food_name(query)
-                return await self.mcp_client.get_food_ingredients(food_name)
-
-            elif any(
-                word in query_lower for word in ["livre", "auteur", "roman", "histoire"]
-            ):
-                # Question sur les livres
-                book_name = self._extract_book_name(query)
-                return await self.mcp_client.get_book_info(book_name)
-
-            elif "liste" in query_lower and "plat" in query_lower:
-                return await self.mcp_client.list_foods()
-
-            elif "liste" in query_lower and "livre" in query_lower:
-                return await self.mcp_client.list_books()
+            # Un seul passage sur la requête: noms du catalogue et intentions
+            matcher = await self._get_matcher(client)
+            with tracer.span("route") as span:
+                entities = matcher.analyze(query)
+                span.set(intent=entities["intent"])
 
+            # Toutes les recherches utiles partent en un seul aller-retour
+            if entities["ingredient"] and "reverse" in entities["intent"]:
+                # "Que cuisiner avec ..." : recherche inverse par ingrédients
+                mode = "or" if " ou " in f" {query.lower()} " else "and"
+                calls = [
+                    (
+                        "find_dishes_by_ingredients",
+                        {"ingredients": entities["ingredient"], "mode": mode},
+                    )
+                ]
             else:
+                calls = [
+                    ("get_food_ingredients", {"food_name": name})
+                    for name in entities["food"]
+                ]
+            calls += [
+                ("get_book_info", {"book_name": name}) for name in entities["book"]
+            ]
+
+            if not calls:
+                # Intention sans nom reconnu: on fournit la liste disponible
+                if "food" in entities["intent"]:
+                    calls.append(
+                        ("list_available_foods", {"limit": self.LISTING_LIMIT})
+                    )
+                if "book" in entities["intent"]:
+                    # Livre désigné par son thème ou son auteur
+                    calls.append(("search_books", {"query": query}))
+
+            if not calls:
                 return {"info": "Pas de données spécifiques récupérées via MCP"}
+
+            results = await client.call_many(calls)
         except Exception as e:
             return {"error": f"Erreur lors de l'accès aux données: {str(e)}"}
 
-    def _extract_food_name(self, query):
-        """Extrait le nom du plat de la requête"""
-        foods = ["pizza", "salade", "omelette", "pâtes"]
-        for food in foods:
-            if food in query.lower():
-                return food
-        return "pizza"  # Par défaut
-
-    def _extract_book_name(self, query):
-        """Extrait le nom du livre de la requête"""
-        books = ["1984", "gatsby", "hamlet"]
-        for book in books:
-            if book in query.lower():
-                return book
-        return "1984"  # Par défaut
+        if len(results) == 1:
+            return results[0]["result"]
+        return [result["result"] for result in results]
@@ -1,44 +1,91 @@
 import asyncio
 import json
+import os
 import subprocess
 from contextlib import AsyncExitStack
 from mcp.client.session import ClientSession
 from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp import types
+from tool_cache import ToolResultCache
+from functools import partial
+import sys
+from pathlib import Path
+
+# Modules partagés entre implAPI et implMCP
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.singleflight import SingleFlight
+from common.tracing import tracer
+
+SERVER_SCRIPT = Path(__file__).resolve().parent / "mcp_server.py"
 
 
 class MCPClient:
-    def __init__(self):
+    def __init__(self, transport=None, url=None, cache=None, flights=None):
+        # "stdio" lance un serveur privé, "streamable-http" rejoint un serveur partagé
+        self.transport = transport or os.getenv("MCP_TRANSPORT", "stdio")
+        # Avec la barre finale: sans elle, chaque requête subit une redirection 307
+        self.url = url or os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8001/mcp/")
         self.session = None
         self.connected = False
         self.exit_stack = None
         self.stdio_transport = None
+        # Schémas des outils exposés par le serveur (list_tools)
+        self.tools = []
+        # Résultats d'outils récents, à partager entre les clients d'un pool
+        self.cache = cache if cache is not None else ToolResultCache.from_env()
+        # Appels d'outils en cours, partagés eux aussi entre les clients d'un pool
+        self.flights = flights if flights is not None else SingleFlight()
 
     async def connect(self):
         """Se connecte au serveur MCP"""
+        with tracer.span("mcp.connect", transport=self.transport) as span:
+            connected = await self._connect()
+            if not connected:
+                span.status = "error"
+            return connected
+
+    async def _connect(self):
         try:
             # Créer l'exit stack ici pour éviter les problèmes de contexte
             self.exit_stack = AsyncExitStack()
 
-            # Configuration du serveur MCP FastMCP
-            server_params = StdioServerParameters(
-                command="python", args=["mcp_server.py"]
-            )
+            if self.transport == "streamable-http":
+                # Serveur HTTP partagé, pas de sous-processus
+                read_stream, write_stream, _ = (
+                    await self.exit_stack.enter_async_context(
+                        streamablehttp_client(self.url)
+                    )
+                )
+            else:
+                # Configuration du serveur MCP FastMCP
+                # L'environnement complet transmet CATALOG_PATH & co au serveur
+                # Chemin absolu: le client peut être lancé depuis n'importe où
+                server_params = StdioServerParameters(
+                    command="python",
+                    args=[str(SERVER_SCRIPT), "--transport", "stdio"],
+                    env=dict(os.environ),
+                )
 
-            # Utilisation de stdio_client avec AsyncExitStack
-            self.stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
+                # Utilisation de stdio_client avec AsyncExitStack
+                with tracer.span("mcp.spawn"):
+                    self.stdio_transport = await self.exit_stack.enter_async_context(
+                        stdio_client(server_params)
+                    )
 
-            # Récupération des streams
-            read_stream, write_stream = self.stdio_transport
+                # Récupération des streams
+                read_stream, write_stream = self.stdio_transport
 
             # Création de la session avec les streams
             self.session = await self.exit_stack.enter_async_context(
-                ClientSession(read_stream, write_stream)
+                ClientSession(
+                    read_stream, write_stream, message_handler=self._on_message
+                )
             )
 
             # Initialisation de la session
-            init_result = await self.session.initialize()
+            with tracer.span("mcp.initialize"):
+                init_result = await self.session.initialize()
 
             self.connected = True
             print("Connecté au serveur MCP")
@@ -47,6 +94,7 @@ class MCPClient:
             # Optionnel: Lister les outils disponibles
             try:
                 tools_response = await self.session.list_tools()
+                self.tools = tools_response.tools
                 print(
                     f"Outils disponibles: {[tool.name for tool in tools_response.tools]}"
                 )
@@ -66,6 +114,17 @@ class MCPClient:
             await self._cleanup()
             return False
 
+    async def _on_message(self, message):
+        """Le serveur signale un rechargement du catalogue: le cache est périmé
+
+        Le serveur réutilise tools/list_changed pour ce signal (capacité
+        tools.listChanged déclarée); la liste des outils elle-même ne change pas.
+        """
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            self.cache.invalidate()
+
     async def _cleanup(self):
         """Nettoie les ressources de manière sûre"""
         try:
@@ -89,97 +148,141 @@ class MCPClient:
         except Exception as e:
             print(f"Erreur lors de la déconnexion: {e}")
 
-    async def get_food_ingredients(self, food_name):
-        """Récupère les ingrédients d'un plat"""
+    async def ping(self, timeout=5.0):
+        """Vérifie que le serveur MCP répond toujours"""
         if not self.connected:
-            return {"error": "Pas connecté au serveur MCP"}
+            return False
 
         try:
-            result = await self.session.call_tool(
-                "get_food_ingredients", {"food_name": food_name}
-            )
-
-            # Gestion du résultat selon le type de contenu
-            if result.content:
-                if hasattr(result.content[0], "text"):
-                    return json.loads(result.content[0].text)
-                else:
-                    return {"data": str(result.content[0])}
-            else:
-                return {"error": "Aucun contenu dans la réponse"}
-
-        except json.JSONDecodeError as e:
-            return {"error": f"Erreur de parsing JSON: {str(e)}"}
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
         except Exception as e:
-            return {"error": f"Erreur MCP: {str(e)}"}
-
-    async def get_book_info(self, book_name):
-        """Récupère les infos d'un livre"""
-        if not self.connected:
-            return {"error": "Pas connecté au serveur MCP"}
-
-        try:
-            result = await self.session.call_tool(
-                "get_book_info", {"book_name": book_name}
-            )
+            print(f"Ping MCP échoué: {e}")
+            return False
 
-            # Gestion du résultat selon le type de contenu
-            if result.content:
-                if hasattr(result.content[0], "text"):
-                    return json.loads(result.content[0].text)
-                else:
-                    return {"data": str(result.content[0])}
+    def _parse_result(self, result):
+        """Décode le contenu renvoyé par un outil MCP"""
+        # Gestion du résultat selon le type de contenu
+        if result.content:
+            if hasattr(result.content[0], "text"):
+                return json.loads(result.content[0].text)
             else:
-                return {"error": "Aucun contenu dans la réponse"}
+                return {"data": str(result.content[0])}
+        else:
+            return {"error": "Aucun contenu dans la réponse"}
 
-        except json.JSONDecodeError as e:
-            return {"error": f"Erreur de parsing JSON: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Erreur MCP: {str(e)}"}
-
-    async def list_foods(self):
-        """Liste tous les plats"""
+    async def call_tool(self, tool_name, arguments=None, timeout=None):
+        """Appelle un outil MCP et renvoie son résultat décodé"""
         if not self.connected:
             return {"error": "Pas connecté au serveur MCP"}
 
-        try:
-            result = await self.session.call_tool("list_available_foods", {})
-
-            # Gestion du résultat selon le type de contenu
-            if result.content:
-                if hasattr(result.content[0], "text"):
-                    return json.loads(result.content[0].text)
+        if not self.cache.cacheable(tool_name):
+            return await self._call_tool(tool_name, arguments, timeout)
+
+        cached = self.cache.get(tool_name, arguments)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation
+
+        # Outils en lecture seule: les appels identiques en cours sont partagés
+        data = await self.flights.do(
+            self.cache.make_key(tool_name, arguments),
+            partial(self._call_tool, tool_name, arguments, timeout),
+        )
+        if not (isinstance(data, dict) and "error" in data):
+            self.cache.set(tool_name, arguments, data, generation)
+        return data
+
+    async def _call_tool(self, tool_name, arguments, timeout):
+        with tracer.span("tool.mcp", tool=tool_name) as span:
+            try:
+                call = self.session.call_tool(tool_name, arguments or {})
+                if timeout is not None:
+                    result = await asyncio.wait_for(call, timeout)
                 else:
-                    return {"data": str(result.content[0])}
-            else:
-                return {"error": "Aucun contenu dans la réponse"}
-
-        except json.JSONDecodeError as e:
-            return {"error": f"Erreur de parsing JSON: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Erreur MCP: {str(e)}"}
-
-    async def list_books(self):
-        """Liste tous les livres"""
-        if not self.connected:
-            return {"error": "Pas connecté au serveur MCP"}
-
-        try:
-            result = await self.session.call_tool("list_available_books", {})
+                    result = await call
+                return self._parse_result(result)
+
+            except asyncio.TimeoutError:
+                span.status = "timeout"
+                return {"error": f"Délai dépassé pour l'outil {tool_name}"}
+            except json.JSONDecodeError as e:
+                span.status = "error"
+                return {"error": f"Erreur de parsing JSON: {str(e)}"}
+            except Exception as e:
+                span.status = "error"
+                return {"error": f"Erreur MCP: {str(e)}"}
+
+    async def call_many(self, calls, timeout=10.0, max_concurrency=8):
+        """Envoie plusieurs appels d'outils en parallèle sur la même session
+
+        calls est une liste de tuples (nom_outil, arguments). Les résultats
+        sont renvoyés dans le même ordre, avec "ok" à False pour les appels
+        en échec (erreur, délai dépassé) sans interrompre les autres.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(tool_name, arguments):
+            async with semaphore:
+                data = await self.call_tool(tool_name, arguments, timeout)
+            return {
+                "tool": tool_name,
+                "arguments": arguments,
+                "ok": not (isinstance(data, dict) and "error" in data),
+                "result": data,
+            }
+
+        return await asyncio.gather(*(run(name, args) for name, args in calls))
 
-            # Gestion du résultat selon le type de contenu
-            if result.content:
-                if hasattr(result.content[0], "text"):
-                    return json.loads(result.content[0].text)
-                else:
-                    return {"data": str(result.content[0])}
-            else:
-                return {"error": "Aucun contenu dans la réponse"}
+    async def get_food_ingredients(self, food_name):
+        """Récupère les ingrédients d'un plat"""
+        return await self.call_tool("get_food_ingredients", {"food_name": food_name})
 
-        except json.JSONDecodeError as e:
-            return {"error": f"Erreur de parsing JSON: {str(e)}"}
-        except Exception as e:
-            return {"error": f"Erreur MCP: {str(e)}"}
+    async def get_book_info(self, book_name):
+        """Récupère les infos d'un livre"""
+        return await self.call_tool("get_book_info", {"book_name": book_name})
+
+    async def find_dishes_by_ingredients(self, ingredients, mode="and"):
+        """Trouve les plats à partir d'ingrédients"""
+        return await self.call_tool(
+            "find_dishes_by_ingredients",
+            {"ingredients": list(ingredients), "mode": mode},
+        )
+
+    async def search_books(self, query, k=5):
+        """Recherche plein texte dans les livres"""
+        return await self.call_tool("search_books", {"query": query, "k": k})
+
+    async def list_foods(self, limit=None, cursor=None):
+        """Liste les plats (une page si limit est donné)"""
+        return await self.call_tool(
+            "list_available_foods", {"limit": limit, "cursor": cursor}
+        )
+
+    async def list_books(self, limit=None, cursor=None):
+        """Liste les livres (une page si limit est donné)"""
+        return await self.call_tool(
+            "list_available_books", {"limit": limit, "cursor": cursor}
+        )
+
+    async def list_all(self, tool_name, field, page_size=1000):
+        """Parcourt toutes les pages d'un outil de listing; None en cas d'erreur"""
+        items = []
+        cursor = None
+        while True:
+            data = await self.call_tool(
+                tool_name, {"limit": page_size, "cursor": cursor}
+            )
+            if "error" in data:
+                return None
+            items.extend(data[field])
+            cursor = data.get("next_cursor")
+            if cursor is None:
+                return items
+
+    async def list_ingredients(self):
+        """Liste tous les ingrédients"""
+        return await self.call_tool("list_available_ingredients")
 
     # Méthode pour utiliser le client avec un context manager
     async def __aenter__(self):
@@ -0,0 +1,285 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from mcp_client import MCPClient
+import sys
+from pathlib import Path
+
+# Modules partagés entre implAPI et implMCP
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.tracing import tracer
+
+
+class _PooledClient:
+    """Client MCP détenu par le pool, ouvert et fermé dans sa propre tâche"""
+
+    def __init__(self, client_factory):
+        self.client = client_factory()
+        self.last_used = time.monotonic()
+        self.ok = False
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task = None
+
+    async def start(self):
+        """Lance le sous-processus et attend la fin du handshake MCP"""
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        return self.ok
+
+    async def _run(self):
+        # anyio impose de fermer les contextes stdio dans la tâche qui les a ouverts
+        try:
+            self.ok = await self.client.connect()
+        finally:
+            self._ready.set()
+        if not self.ok:
+            return
+        try:
+            await self._stop.wait()
+        finally:
+            try:
+                await self.client.disconnect()
+            except BaseException as e:
+                print(f"Erreur lors de la fermeture d'un client du pool: {e}")
+
+    @property
+    def alive(self):
+        return (
+            self.ok
+            and self.client.connected
+            and self._task is not None
+            and not self._task.done()
+        )
+
+    async def close(self):
+        """Demande l'arrêt du client et attend la fin de sa tâche"""
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except BaseException as e:
+                print(f"Erreur lors de l'arrêt d'un client du pool: {e}")
+
+
+class MCPClientPool:
+    """Pool de sessions MCP persistantes et déjà initialisées"""
+
+    def __init__(
+        self,
+        size=4,
+        min_size=None,
+        idle_timeout=300.0,
+        health_interval=30.0,
+        acquire_timeout=30.0,
+        client_factory=MCPClient,
+    ):
+        self.size = size
+        self.min_size = size if min_size is None else min(min_size, size)
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.acquire_timeout = acquire_timeout
+        self.client_factory = client_factory
+
+        self._idle = deque()
+        self._total = 0
+        self._cond = asyncio.Condition()
+        self._maintenance_task = None
+        # Relances en arrière-plan: référencées jusqu'à leur fin, attendues à la fermeture
+        self._background = set()
+        self._closed = False
+
+    async def start(self):
+        """Pré-démarre min_size clients et lance la surveillance du pool"""
+        await self._fill()
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        return self
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Emprunte un client connecté et le rend au pool en sortie"""
+        with tracer.span("mcp.acquire"):
+            pooled = await self._checkout()
+        try:
+            yield pooled.client
+        finally:
+            await self._checkin(pooled)
+
+    async def _checkout(self):
+        if self._closed:
+            raise RuntimeError("Le pool MCP est fermé")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.acquire_timeout
+        dead = []
+        try:
+            async with self._cond:
+                while True:
+                    while self._idle:
+                        pooled = self._idle.popleft()
+                        if pooled.alive:
+                            return pooled
+                        self._total -= 1
+                        dead.append(pooled)
+
+                    if self._total < self.size:
+                        # Réserve la place avant de lancer le processus hors du verrou
+                        self._total += 1
+                        break
+
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise TimeoutError("Aucun client MCP disponible dans le pool")
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            for pooled in dead:
+                await pooled.close()
+
+        try:
+            return await self._spawn()
+        except BaseException:
+            async with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    async def _checkin(self, pooled):
+        pooled.last_used = time.monotonic()
+        async with self._cond:
+            if pooled.alive and not self._closed:
+                self._idle.append(pooled)
+                self._cond.notify()
+                return
+            self._total -= 1
+            self._cond.notify()
+
+        await pooled.close()
+        if not self._closed:
+            # Relance en arrière-plan pour ne pas pénaliser l'appelant
+            self._in_background(self._fill())
+
+    def _in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Erreur d'une tâche de fond du pool MCP: {task.exception()}")
+
+    async def _spawn(self):
+        pooled = _PooledClient(self.client_factory)
+        if not await pooled.start():
+            await pooled.close()
+            raise ConnectionError("Impossible de se connecter au serveur MCP")
+        return pooled
+
+    async def _fill(self):
+        """Relance des clients jusqu'à revenir à min_size"""
+        async with self._cond:
+            missing = max(0, self.min_size - self._total)
+            self._total += missing
+
+        if not missing:
+            return
+
+        results = await asyncio.gather(
+            *(self._spawn() for _ in range(missing)), return_exceptions=True
+        )
+        late = []
+        async with self._cond:
+            for result in results:
+                if isinstance(result, BaseException):
+                    self._total -= 1
+                    print(f"Échec de démarrage d'un client MCP: {result}")
+                elif self._closed:
+                    self._total -= 1
+                    late.append(result)
+                else:
+                    self._idle.append(result)
+            self._cond.notify_all()
+
+        # Pool fermé pendant le démarrage: ces clients ne serviront pas
+        for pooled in late:
+            await pooled.close()
+
+    async def _maintenance_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self._check_idle_clients()
+                await self._fill()
+            except Exception as e:
+                print(f"Erreur lors de la maintenance du pool MCP: {e}")
+
+    async def _check_idle_clients(self):
+        """Évince les clients morts, inactifs ou qui ne répondent plus au ping"""
+        now = time.monotonic()
+        to_close = []
+        async with self._cond:
+            candidates = list(self._idle)
+            self._idle.clear()
+            for pooled in candidates:
+                idle_for = now - pooled.last_used
+                if not pooled.alive or (
+                    idle_for > self.idle_timeout and self._total > self.min_size
+                ):
+                    self._total -= 1
+                    to_close.append(pooled)
+                else:
+                    self._idle.append(pooled)
+            healthy = list(self._idle)
+
+        pings = await asyncio.gather(*(p.client.ping() for p in healthy))
+        async with self._cond:
+            for pooled, ok in zip(healthy, pings):
+                if not ok and pooled in self._idle:
+                    self._idle.remove(pooled)
+                    self._total -= 1
+                    to_close.append(pooled)
+
+        for pooled in to_close:
+            await pooled.close()
+
+    def stats(self):
+        """Statistiques simples du pool"""
+        return {
+            "size": self.size,
+            "min_size": self.min_size,
+            "total": self._total,
+            "idle": len(self._idle),
+            "in_use": self._total - len(self._idle),
+        }
+
+    async def close(self):
+        """Ferme tous les clients inactifs; les clients empruntés seront fermés au retour"""
+        self._closed = True
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            await asyncio.gather(self._maintenance_task, return_exceptions=True)
+            self._maintenance_task = None
+
+        async with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            self._cond.notify_all()
+
+        for pooled in idle:
+            await pooled.close()
+
+        # Relances encore en cours: leurs clients sont fermés dès leur démarrage
+        while self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
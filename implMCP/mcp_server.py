@@ -1,82 +1,189 @@
+import argparse
 import asyncio
 import json
+import os
+import weakref
+from functools import partial
 from mcp.server import Server
+from mcp.server.lowlevel import NotificationOptions
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent, CallToolResult
 from pydantic import BaseModel
 from mcp.server.fastmcp import FastMCP
+import sys
+from pathlib import Path
 
+# Modules partagés entre implAPI et implMCP
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.catalog import get_catalog
+from common.pagination import MAX_PAGE_SIZE, InvalidCursor, paginate
 
-# Mêmes données
-FOOD_DATA = {
-    "pizza": ["farine", "tomate", "mozzarella", "huile d'olive", "basilic"],
-    "salade": ["laitue", "tomate", "concombre", "vinaigrette", "oignon"],
-    "omelette": ["œufs", "beurre", "sel", "poivre", "herbes"],
-    "pâtes": ["pâtes", "sauce tomate", "parmesan", "ail", "huile"],
-}
-
-BOOK_DATA = {
-    "1984": {
-        "titre": "1984",
-        "auteur": "George Orwell",
-        "annee": 1949,
-        "resume": "Roman dystopique sur la surveillance totalitaire",
-    },
-    "gatsby": {
-        "titre": "Gatsby le Magnifique",
-        "auteur": "F. Scott Fitzgerald",
-        "annee": 1925,
-        "resume": "Histoire tragique du rêve américain dans les années 20",
-    },
-    "hamlet": {
-        "titre": "Hamlet",
-        "auteur": "William Shakespeare",
-        "annee": 1603,
-        "resume": "Tragédie du prince du Danemark",
-    },
-}
+
+# Catalogue partagé avec l'API, rechargé à chaud
+catalog = get_catalog()
 
 # Créer le serveur MCP
 app = FastMCP("demo-food-books")
 
+# Noms proposés quand un plat ou un livre est introuvable (première page)
+LISTING_LIMIT = 50
+
+# Sessions clientes à prévenir quand le catalogue est rechargé
+_sessions = weakref.WeakKeyDictionary()
+
+
+def _declare_tool_list_changed(server):
+    """Déclare la capacité tools.listChanged, que FastMCP n'annonce pas
+
+    FastMCP construit ses options d'initialisation sans NotificationOptions
+    (stdio comme streamable HTTP): on fournit celles qui annoncent
+    notifications/tools/list_changed, envoyée à chaque rechargement.
+    """
+    create_options = server.create_initialization_options
+
+    def create_with_list_changed(notification_options=None, *args, **kwargs):
+        return create_options(
+            notification_options or NotificationOptions(tools_changed=True),
+            *args,
+            **kwargs,
+        )
+
+    server.create_initialization_options = create_with_list_changed
+
+
+_declare_tool_list_changed(app._mcp_server)
+
+
+def _track_session():
+    """Retient la session qui appelle l'outil, avec sa boucle asyncio"""
+    try:
+        session = app.get_context().session
+        _sessions[session] = asyncio.get_running_loop()
+    except (LookupError, RuntimeError, ValueError):
+        pass
+
+
+def _notify_catalog_reload(snapshot):
+    """Listener du catalogue (thread de surveillance): invalide les caches clients
+
+    notifications/tools/list_changed est réutilisée comme signal
+    d'invalidation: la liste des outils ne change pas, mais leurs résultats
+    si. Un client qui relit la liste la retrouve identique; MCPClient vide
+    son cache de résultats. MCP n'a pas de notification "données
+    modifiées" hors ressources, et ce serveur n'expose pas de ressource.
+    """
+    for session, loop in list(_sessions.items()):
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                session.send_tool_list_changed(), loop
+            )
+        except RuntimeError:
+            # Boucle fermée: la session n'existe plus
+            _sessions.pop(session, None)
+            continue
+        future.add_done_callback(partial(_forget_on_error, session))
+
+
+def _forget_on_error(session, future):
+    # Notification impossible: session fermée, on ne la prévient plus
+    if future.cancelled() or future.exception() is not None:
+        _sessions.pop(session, None)
+
+
+catalog.add_listener(_notify_catalog_reload)
+
 
 @app.tool()
 def get_food_ingredients(food_name: str) -> dict:
     """Récupère la liste des ingrédients d'un plat"""
-    food_name = food_name.lower()
-    if food_name in FOOD_DATA:
-        return {"plat": food_name, "ingredients": FOOD_DATA[food_name]}
+    _track_session()
+    snapshot = catalog.snapshot()
+    key = snapshot.find_food(food_name)
+    if key is not None:
+        return {"plat": key, "ingredients": snapshot.foods[key]}
     else:
+        # Première page seulement: le reste se parcourt avec list_available_foods
         return {
             "error": f"Plat '{food_name}' non trouvé",
-            "plats_disponibles": list(FOOD_DATA.keys()),
+            **_page(snapshot.food_keys, "plats_disponibles", LISTING_LIMIT, None),
         }
 
 
+def _page(keys, field, limit, cursor):
+    """Page de clés triées; sans limit, toute la liste"""
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    try:
+        page, next_cursor = paginate(keys, cursor, limit)
+    except InvalidCursor as e:
+        return {"error": str(e)}
+    return {field: page, "next_cursor": next_cursor}
+
+
+@app.tool()
+def list_available_foods(limit: int | None = None, cursor: str | None = None) -> dict:
+    """Liste les plats disponibles; limit et cursor (next_cursor) pour paginer"""
+    _track_session()
+    return _page(catalog.snapshot().food_keys, "plats_disponibles", limit, cursor)
+
+
+@app.tool()
+def find_dishes_by_ingredients(ingredients: list[str], mode: str = "and") -> dict:
+    """Trouve les plats contenant tous les ingrédients (mode "and") ou au moins un (mode "or")"""
+    _track_session()
+    index = catalog.snapshot().ingredient_index
+    return {
+        "ingredients": ingredients,
+        "mode": mode,
+        "plats": index.query(ingredients, "or" if mode == "or" else "and", 100),
+    }
+
+
 @app.tool()
-def list_available_foods() -> dict:
-    """Liste tous les plats disponibles"""
-    return {"plats_disponibles": list(FOOD_DATA.keys())}
+def list_available_ingredients() -> dict:
+    """Liste tous les ingrédients connus"""
+    _track_session()
+    return {
+        "ingredients_disponibles": catalog.snapshot().ingredient_index.ingredients()
+    }
 
 
 # Book related tools
 @app.tool()
 def get_book_info(book_name: str) -> dict:
     """Récupère les informations d'un livre"""
-    book_name = book_name.lower()
-    if book_name in BOOK_DATA:
-        return BOOK_DATA[book_name]
+    _track_session()
+    snapshot = catalog.snapshot()
+    key = snapshot.find_book(book_name)
+    if key is not None:
+        return snapshot.books[key]
     else:
+        # Première page seulement: le reste se parcourt avec list_available_books
         return {
             "error": f"Livre '{book_name}' non trouvé",
-            "livres_disponibles": list(BOOK_DATA.keys()),
+            **_page(snapshot.book_keys, "livres_disponibles", LISTING_LIMIT, None),
         }
 
 
 @app.tool()
-def list_available_books() -> dict:
-    """Liste tous les livres disponibles"""
-    return {"livres_disponibles": list(BOOK_DATA.keys())}
+def list_available_books(limit: int | None = None, cursor: str | None = None) -> dict:
+    """Liste les livres disponibles; limit et cursor (next_cursor) pour paginer"""
+    _track_session()
+    return _page(catalog.snapshot().book_keys, "livres_disponibles", limit, cursor)
+
+
+@app.tool()
+def search_books(query: str, k: int = 5) -> dict:
+    """Recherche des livres par thème, auteur ou mots du titre"""
+    _track_session()
+    snapshot = catalog.snapshot()
+    return {
+        "requete": query,
+        "resultats": [
+            {"livre": key, "score": score, **snapshot.books[key]}
+            for key, score in snapshot.book_search.search(query, max(1, min(k, 50)))
+        ],
+    }
 
 
 async def main():
@@ -95,7 +202,48 @@ async def main():
         raise
 
 
+def create_http_app():
+    """Application ASGI streamable HTTP (une instance par worker uvicorn)"""
+    # Sans état: chaque requête est autonome, n'importe quel worker peut la servir
+    app.settings.stateless_http = True
+    app.settings.json_response = True
+    return app.streamable_http_app()
+
+
+def run_http(host, port, workers):
+    """Sert le serveur MCP en streamable HTTP sur plusieurs workers uvicorn"""
+    import uvicorn
+
+    # Point d'entrée monté (Mount): "/mcp" seul est redirigé (307) vers "/mcp/"
+    path = app.settings.streamable_http_path.rstrip("/") + "/"
+    print(f"Serveur MCP HTTP démarré sur http://{host}:{port}{path}")
+    uvicorn.run(
+        "mcp_server:create_http_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
 if __name__ == "__main__":
-    # asyncio.run(main())
-    # Initialize and run the server
-    app.run(transport="stdio")
+    parser = argparse.ArgumentParser(description="Serveur MCP demo-food-books")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "streamable-http"],
+        default=os.getenv("MCP_TRANSPORT", "stdio"),
+    )
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8001")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("MCP_WORKERS", "4"))
+    )
+    args = parser.parse_args()
+
+    if args.transport == "streamable-http":
+        run_http(args.host, args.port, args.workers)
+    else:
+        # asyncio.run(main())
+        # Initialize and run the server
+        app.run(transport="stdio")
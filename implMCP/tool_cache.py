@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Durée de vie (s) des résultats par outil; les outils absents ne sont pas mis en cache
+DEFAULT_TOOL_TTLS = {
+    "get_food_ingredients": 300.0,
+    "get_book_info": 300.0,
+    "find_dishes_by_ingredients": 120.0,
+    "search_books": 120.0,
+    "list_available_foods": 60.0,
+    "list_available_books": 60.0,
+    "list_available_ingredients": 60.0,
+}
+
+
+class ToolResultCache:
+    """Cache LRU des résultats d'outils MCP, avec un TTL par outil
+
+    Partagé par tous les clients d'un pool: une notification reçue sur
+    n'importe quelle session (rechargement du catalogue) le vide en entier.
+    """
+
+    def __init__(self, max_entries=2048, ttls=None):
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TOOL_TTLS if ttls is None else ttls)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrémenté à chaque invalidation: un résultat demandé avant n'est pas gardé
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Configure le cache depuis MCP_TOOL_CACHE_SIZE (0 le désactive)"""
+        return cls(max_entries=int(os.getenv("MCP_TOOL_CACHE_SIZE", "2048")))
+
+    @staticmethod
+    def make_key(tool_name, arguments):
+        return tool_name, json.dumps(arguments or {}, sort_keys=True, default=str)
+
+    def cacheable(self, tool_name):
+        return self.max_entries > 0 and tool_name in self.ttls
+
+    def get(self, tool_name, arguments):
+        """Résultat en cache, ou None s'il est absent ou expiré"""
+        key = self.make_key(tool_name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, tool_name, arguments, value, generation):
+        """Enregistre un résultat obtenu pendant la génération indiquée"""
+        key = self.make_key(tool_name, arguments)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttls[tool_name])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Oublie tous les résultats (le catalogue du serveur a changé)"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "invalidations": self.invalidations,
+            }
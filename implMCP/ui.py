@@ -1,6 +1,18 @@
 import streamlit as st
 import asyncio
+import os
+import time
+from functools import partial
 from llm import MCPLLMService
+from mcp_client import MCPClient
+from mcp_pool import MCPClientPool
+from tool_cache import ToolResultCache
+from common.completion_cache import CompletionCache
+from common.singleflight import SingleFlight
+from common.event_loop import BackgroundEventLoop
+from common.llm_providers import LABELS
+from common.tracing import tracer
+from common.ui_compare import render_comparison, show_measures
 
 
 st.set_page_config(page_title="Demo MCP vs API", page_icon="🔗", layout="wide")
@@ -8,57 +20,114 @@ st.set_page_config(page_title="Demo MCP vs API", page_icon="🔗", layout="wide"
 st.title("Demo: LLM avec MCP")
 
 
-# Initialisation du serveur MCP - Sans cache pour éviter les problèmes de contexte
+# Boucle asyncio persistante: le pool MCP doit survivre aux reruns Streamlit
+@st.cache_resource
+def get_background_loop():
+    """Boucle asyncio du processus, dans un thread d'arrière-plan, partagée par les sessions"""
+    return BackgroundEventLoop(name="mcp-loop")
+
+
+def run_async(coro, timeout=None):
+    """Exécute une coroutine sur la boucle persistante et attend son résultat"""
+    return get_background_loop().run(coro, timeout)
+
+
+def stream_async(agen):
+    """Parcourt un générateur asynchrone depuis le script, morceau par morceau"""
+    return get_background_loop().stream(agen)
+
+
+@st.cache_resource
+def get_mcp_pool():
+    """Pool de clients MCP partagé par toutes les sessions du processus"""
+    pool = MCPClientPool(
+        size=int(os.getenv("MCP_POOL_SIZE", "4")),
+        min_size=int(os.getenv("MCP_POOL_MIN_SIZE", "2")),
+        idle_timeout=float(os.getenv("MCP_POOL_IDLE_TIMEOUT", "300")),
+        health_interval=float(os.getenv("MCP_POOL_HEALTH_INTERVAL", "30")),
+        # Un seul cache et des appels en cours partagés par tous les clients du pool
+        client_factory=partial(
+            MCPClient, cache=get_tool_cache(), flights=SingleFlight()
+        ),
+    )
+    run_async(pool.start())
+    # Arrêt du processus: les sous-processus MCP sont fermés proprement
+    get_background_loop().on_shutdown(pool.close)
+    return pool
+
+
+@st.cache_resource
+def get_tool_cache():
+    """Cache des résultats d'outils MCP partagé par toutes les sessions"""
+    return ToolResultCache.from_env()
+
+
+@st.cache_resource
+def get_completion_cache():
+    """Cache des complétions partagé par toutes les sessions"""
+    return CompletionCache.from_env()
+
+
+@st.cache_resource
 def get_mcp_service():
-    """Crée une nouvelle instance du service à chaque fois"""
-    return MCPLLMService()
+    """Service partagé qui emprunte ses connexions au pool"""
+    return MCPLLMService(pool=get_mcp_pool(), cache=get_completion_cache())
 
 
 # Fonction pour gérer les appels async avec gestion d'erreur améliorée
-async def process_query_with_openai(query):
+async def process_query_with_openai(query, use_tools=False):
     service = get_mcp_service()
     try:
+        if use_tools:
+            return await service.process_with_openai_tools(query)
         return await service.process_with_openai(query)
     except Exception as e:
         return f"Erreur lors du traitement: {str(e)}"
-    finally:
-        # Nettoyage explicite
-        try:
-            await service.close_mcp()
-        except Exception as cleanup_error:
-            print(f"Erreur lors du nettoyage: {cleanup_error}")
 
 
-async def process_query_with_claude(query):
+async def process_query_with_claude(query, use_tools=False):
     service = get_mcp_service()
     try:
+        if use_tools:
+            return await service.process_with_claude_tools(query)
         return await service.process_with_claude(query)
     except Exception as e:
         return f"Erreur lors du traitement: {str(e)}"
-    finally:
-        # Nettoyage explicite
-        try:
-            await service.close_mcp()
-        except Exception as cleanup_error:
-            print(f"Erreur lors du nettoyage: {cleanup_error}")
 
 
-async def test_mcp_connection():
-    """Test de connexion MCP avec nettoyage approprié"""
+async def compare_with_tools(query):
+    """Les deux boucles d'outils en parallèle, chacune chronométrée"""
     service = get_mcp_service()
+
+    async def timed(coro):
+        started = time.monotonic()
+        answer = await coro
+        return answer, {"latence_s": time.monotonic() - started}
+
+    results = await asyncio.gather(
+        timed(service.process_with_openai_tools(query)),
+        timed(service.process_with_claude_tools(query)),
+    )
+    return dict(zip(LABELS, results))
+
+
+async def test_mcp_connection():
+    """Test de connexion MCP via un client du pool"""
     try:
-        success = await service.init_mcp()
-        return success
+        async with get_mcp_pool().acquire() as client:
+            return await client.ping()
     except Exception as e:
         print(f"Erreur lors du test de connexion: {e}")
         return False
-    finally:
-        try:
-            await service.close_mcp()
-        except Exception as cleanup_error:
-            print(f"Erreur lors du nettoyage: {cleanup_error}")
 
 
+st.sidebar.subheader("Cache des réponses")
+st.sidebar.json(get_completion_cache().stats())
+st.sidebar.subheader("Cache des outils MCP")
+st.sidebar.json(get_tool_cache().stats())
+with st.sidebar.expander("Latences par étape"):
+    st.json(tracer.summary())
+
 # Interface utilisateur
 col1, col2 = st.columns(2)
 
@@ -77,79 +146,127 @@ user_query = st.text_input(
     "Pose ta question:", placeholder="Ex: Quels ingrédients pour la pizza ?"
 )
 
+use_tools = st.toggle(
+    "Mode outils natifs",
+    help="Le modèle choisit lui-même les outils MCP à appeler, en parallèle si besoin",
+)
+
 # Boutons
-col1, col2 = st.columns(2)
+col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     if st.button("🟢 OpenAI (MCP)", use_container_width=True):
         print("Bouton OpenAI cliqué")
         if user_query:
-            with st.spinner("OpenAI + MCP travaillent..."):
-                try:
-                    # Utilisation d'asyncio.create_task pour une meilleure gestion
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        response = loop.run_until_complete(
-                            process_query_with_openai(user_query)
+            try:
+                if use_tools:
+                    with st.spinner("OpenAI + MCP travaillent..."):
+                        response = run_async(
+                            process_query_with_openai(user_query, True)
                         )
-                        st.success("Réponse OpenAI (via MCP):")
-                        st.write(response)
-                    finally:
-                        # Nettoyage explicite de la boucle
-                        pending = asyncio.all_tasks(loop)
-                        for task in pending:
-                            task.cancel()
-                        loop.close()
-                except Exception as e:
-                    st.error(f"Erreur: {e}")
-                    print(f"Erreur détaillée: {e}")
+                    st.success("Réponse OpenAI (via MCP):")
+                    st.write(response)
+                else:
+                    # Affichage progressif des tokens
+                    st.success("Réponse OpenAI (via MCP):")
+                    st.write_stream(
+                        stream_async(get_mcp_service().stream_with_openai(user_query))
+                    )
+            except Exception as e:
+                st.error(f"Erreur: {e}")
+                print(f"Erreur détaillée: {e}")
         else:
             st.warning("Tape une question d'abord!")
 
 with col2:
     if st.button("🔵 Claude (MCP)", use_container_width=True):
         if user_query:
-            with st.spinner("Claude + MCP travaillent..."):
-                try:
-                    # Même approche pour Claude
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        response = loop.run_until_complete(
-                            process_query_with_claude(user_query)
+            try:
+                if use_tools:
+                    with st.spinner("Claude + MCP travaillent..."):
+                        response = run_async(
+                            process_query_with_claude(user_query, True)
+                        )
+                    st.success("Réponse Claude (via MCP):")
+                    st.write(response)
+                else:
+                    # Affichage progressif des tokens
+                    st.success("Réponse Claude (via MCP):")
+                    st.write_stream(
+                        stream_async(get_mcp_service().stream_with_claude(user_query))
+                    )
+            except Exception as e:
+                st.error(f"Erreur: {e}")
+                print(f"Erreur détaillée: {e}")
+        else:
+            st.warning("Tape une question d'abord!")
+
+with col3:
+    if st.button("⚡ Le plus rapide (MCP)", use_container_width=True):
+        if user_query:
+            try:
+                # Le fournisseur retenu n'est connu qu'au premier token
+                winner = []
+                st.success("Réponse la plus rapide (via MCP):")
+                st.write_stream(
+                    stream_async(
+                        get_mcp_service().stream_fastest(
+                            user_query, on_winner=winner.append
                         )
-                        st.success("Réponse Claude (via MCP):")
-                        st.write(response)
-                    finally:
-                        pending = asyncio.all_tasks(loop)
-                        for task in pending:
-                            task.cancel()
-                        loop.close()
-                except Exception as e:
-                    st.error(f"Erreur: {e}")
-                    print(f"Erreur détaillée: {e}")
+                    )
+                )
+                if winner:
+                    st.caption(f"Répondu par {winner[0]}")
+            except Exception as e:
+                st.error(f"Erreur: {e}")
+                print(f"Erreur détaillée: {e}")
         else:
             st.warning("Tape une question d'abord!")
 
+with col4:
+    compare = st.button("⚖️ Comparer (MCP)", use_container_width=True)
+
+if compare:
+    if user_query:
+        try:
+            if use_tools:
+                # Chaque modèle choisit ses outils: pas de données communes à partager
+                with st.spinner("OpenAI et Claude travaillent en parallèle..."):
+                    results = run_async(compare_with_tools(user_query))
+                for (name, (answer, stats)), column in zip(
+                    results.items(), st.columns(2)
+                ):
+                    column.success(f"Réponse {LABELS[name]} (via MCP):")
+                    column.write(answer)
+                    show_measures(column, stats)
+            else:
+                # Données MCP récupérées une fois, puis les deux fournisseurs en parallèle
+                stats = {}
+                render_comparison(
+                    stream_async(
+                        get_mcp_service().stream_compare(
+                            user_query, on_done=stats.__setitem__
+                        )
+                    ),
+                    stats,
+                )
+        except Exception as e:
+            st.error(f"Erreur: {e}")
+            print(f"Erreur détaillée: {e}")
+    else:
+        st.warning("Tape une question d'abord!")
+
 # Statut de connexion MCP
 if st.button("Tester connexion MCP"):
     print("Test de connexion MCP...")
     with st.spinner("Test de connexion..."):
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                success = loop.run_until_complete(test_mcp_connection())
-                if success:
-                    st.success("Connexion MCP OK!")
-                else:
-                    st.error("Échec de connexion MCP")
-            finally:
-                pending = asyncio.all_tasks(loop)
-                for task in pending:
-                    task.cancel()
-                loop.close()
+            success = run_async(test_mcp_connection(), timeout=30)
+            if success:
+                st.success("Connexion MCP OK!")
+                st.caption(f"Pool MCP: {get_mcp_pool().stats()}")
+            else:
+                st.error("Échec de connexion MCP")
         except Exception as e:
             st.error(f"Erreur: {e}")
             print(f"Erreur détaillée: {e}")
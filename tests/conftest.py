@@ -0,0 +1,104 @@
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules partagés importables comme depuis implAPI et implMCP
+sys.path.append(str(ROOT))
+
+INGREDIENTS = [
+    "farine",
+    "tomate",
+    "sauce tomate",
+    "mozzarella",
+    "huile d'olive",
+    "basilic",
+    "œufs",
+    "beurre",
+    "sel",
+    "poivre",
+    "ail",
+    "oignon",
+    "crème fraîche",
+    "lardons",
+    "parmesan",
+    "riz",
+    "safran",
+    "poulet",
+    "citron",
+    "pâtes",
+]
+
+WORDS = [
+    "voyage",
+    "mer",
+    "guerre",
+    "amour",
+    "dystopie",
+    "surveillance",
+    "famille",
+    "enquête",
+    "montagne",
+    "révolution",
+    "mémoire",
+    "exil",
+]
+
+
+@pytest.fixture(scope="session")
+def catalog_data():
+    """Catalogue synthétique reproductible: (foods, books)"""
+    rng = random.Random(42)
+    foods = {
+        f"plat {i:03d}": rng.sample(INGREDIENTS, rng.randint(2, 6)) for i in range(300)
+    }
+    foods["pâtes carbonara"] = ["pâtes", "lardons", "œufs", "parmesan"]
+    books = {}
+    for i in range(200):
+        theme = rng.sample(WORDS, 3)
+        books[f"livre-{i:03d}"] = {
+            "titre": f"Livre {i} {theme[0]}",
+            "auteur": f"Auteur {rng.randint(1, 40)}",
+            "annee": 1900 + i,
+            "resume": " ".join(rng.choices(WORDS, k=8)),
+        }
+    books["1984"] = {
+        "titre": "1984",
+        "auteur": "George Orwell",
+        "annee": 1949,
+        "resume": "Roman dystopique sur la surveillance totalitaire",
+    }
+    return foods, books
+
+
+@pytest.fixture(scope="session")
+def mock_llm():
+    """Faux serveur OpenAI / Anthropic (bench/mock_llm.py) lancé dans un thread
+
+    Fournit le module: les tests règlent mock_llm.config avant leurs appels.
+    """
+    pytest.importorskip("fastapi")
+    uvicorn = pytest.importorskip("uvicorn")
+    sys.path.append(str(ROOT / "bench"))
+    import mock_llm
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(mock_llm.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    mock_llm.url = f"http://127.0.0.1:{port}"
+    yield mock_llm
+    server.should_exit = True
+    thread.join(5)
@@ -0,0 +1,67 @@
+import math
+
+from common.book_search import BookSearchIndex, analyze
+
+BOOKS = {
+    "1984": {
+        "titre": "1984",
+        "auteur": "George Orwell",
+        "resume": "Roman dystopique sur la surveillance totalitaire",
+    },
+    "meilleur": {
+        "titre": "Le Meilleur des mondes",
+        "auteur": "Aldous Huxley",
+        "resume": "Une dystopie sur le conditionnement",
+    },
+    "dystopies": {
+        "titre": "Dystopies",
+        "auteur": "Collectif",
+        "resume": "Nouvelles",
+    },
+    "gatsby": {
+        "titre": "Gatsby le Magnifique",
+        "auteur": "F. Scott Fitzgerald",
+        "resume": "Le rêve américain dans les années 20",
+    },
+}
+
+
+def test_analyze_drops_stopwords_and_stems():
+    assert analyze("Un livre sur la dystopie") == ["dystop"]
+    assert analyze("dystopique") == analyze("dystopies")
+
+
+def test_title_match_ranks_above_summary_match():
+    index = BookSearchIndex(BOOKS)
+    ranked = [key for key, _ in index.search("dystopie")]
+    # Titre (poids 3) avant les résumés (poids 1)
+    assert ranked[0] == "dystopies"
+    assert set(ranked) == {"dystopies", "1984", "meilleur"}
+
+
+def test_scores_follow_bm25():
+    index = BookSearchIndex(BOOKS)
+    (key, score), *_ = index.search("orwell")
+    assert key == "1984"
+    # Un seul livre contient le terme (df = 1), fréquence pondérée 2 (auteur)
+    n, frequency = len(BOOKS), 2
+    idf = math.log(1 + (n - 1 + 0.5) / (1 + 0.5))
+    length = next(length for _, _, length in index.postings["orwell"])
+    norm = index.k1 * (1 - index.b + index.b * length / index.average_length)
+    expected = idf * frequency * (index.k1 + 1) / (frequency + norm)
+    assert score == round(expected, 4)
+
+
+def test_k_limits_results_and_unknown_terms_match_nothing():
+    index = BookSearchIndex(BOOKS)
+    assert len(index.search("dystopie", k=2)) == 2
+    assert index.search("cuisine italienne") == []
+
+
+def test_from_postings_gives_identical_rankings():
+    built = BookSearchIndex(BOOKS)
+    loaded = BookSearchIndex.from_postings(
+        built.keys, built.postings, built.average_length
+    )
+    for query in ["dystopie", "rêve américain", "huxley"]:
+        assert loaded.search(query) == built.search(query)
@@ -0,0 +1,53 @@
+from common.catalog import (
+    DEFAULT_BOOK_DATA,
+    DEFAULT_FOOD_DATA,
+    CatalogStore,
+    load_catalog,
+    write_catalog,
+)
+
+
+def test_sqlite_round_trip(tmp_path, catalog_data):
+    foods, books = catalog_data
+    path = tmp_path / "catalog.db"
+    write_catalog(path, foods, books)
+    snapshot = load_catalog(path, version="v1")
+    assert snapshot.foods == foods
+    assert snapshot.books == books
+    assert snapshot.version == "v1"
+
+
+def test_find_tolerates_case_accents_and_titles(tmp_path):
+    path = tmp_path / "catalog.db"
+    write_catalog(path, DEFAULT_FOOD_DATA, DEFAULT_BOOK_DATA)
+    snapshot = load_catalog(path, version=None).warm()
+    assert snapshot.find_food("PATES") == "pâtes"
+    assert snapshot.find_food("Pizzas") == "pizza"
+    assert snapshot.find_food("choucroute") is None
+    assert snapshot.find_book("Gatsby le magnifique") == "gatsby"
+    assert snapshot.book_keys == sorted(DEFAULT_BOOK_DATA)
+
+
+def test_store_creates_default_catalog(tmp_path):
+    store = CatalogStore(tmp_path / "new.db")
+    assert set(store.snapshot().foods) == set(DEFAULT_FOOD_DATA)
+
+
+def test_store_reloads_replaced_file_and_notifies(tmp_path):
+    path = tmp_path / "catalog.db"
+    write_catalog(path, DEFAULT_FOOD_DATA, DEFAULT_BOOK_DATA)
+    store = CatalogStore(path)
+    before = store.snapshot()
+    seen = []
+    store.add_listener(seen.append)
+
+    assert not store.reload()
+    foods = {**DEFAULT_FOOD_DATA, "ratatouille": ["courgette", "aubergine"]}
+    write_catalog(path, foods, DEFAULT_BOOK_DATA)
+    assert store.reload()
+
+    after = store.snapshot()
+    assert seen == [after]
+    assert after.find_food("ratatouille") == "ratatouille"
+    # Une requête en cours garde sa snapshot
+    assert before.find_food("ratatouille") is None
@@ -0,0 +1,94 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from common.compare import merge_streams
+
+
+async def ticking(chunks, delay, closed=None):
+    try:
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+def collect(factories, on_done=None):
+    async def scenario():
+        return [item async for item in merge_streams(factories, on_done)]
+
+    return asyncio.run(scenario())
+
+
+def test_chunks_are_relayed_in_arrival_order():
+    items = collect(
+        {
+            "rapide": partial(ticking, ["a", "b", "c"], 0.01),
+            "lent": partial(ticking, ["x", "y"], 0.025),
+        }
+    )
+    assert [chunk for name, chunk in items if name == "rapide"] == ["a", "b", "c"]
+    assert [chunk for name, chunk in items if name == "lent"] == ["x", "y"]
+    # Le flux rapide a fini avant le second morceau du lent
+    assert items.index(("rapide", "c")) < items.index(("lent", "y"))
+
+
+def test_on_done_reports_stats_for_each_stream():
+    done = {}
+    collect(
+        {
+            "openai": partial(ticking, ["un ", "deux ", "trois"], 0.01),
+            "claude": partial(ticking, [], 0.01),
+        },
+        on_done=lambda name, stats: done.update({name: stats}),
+    )
+    openai = done["openai"]
+    assert set(openai) == {"latence_s", "ttft_s", "morceaux", "tokens"}
+    assert openai["morceaux"] == 3
+    assert openai["tokens"] == len("un deux trois") // 4
+    assert 0 < openai["ttft_s"] <= openai["latence_s"]
+    assert done["claude"]["ttft_s"] is None
+    assert done["claude"]["morceaux"] == 0
+
+
+def test_errors_are_raised_once_the_other_streams_finish():
+    done = []
+
+    async def broken():
+        yield "début"
+        raise RuntimeError("coupure")
+
+    async def scenario():
+        items = []
+        with pytest.raises(RuntimeError):
+            async for item in merge_streams(
+                {"cassé": broken, "sain": partial(ticking, ["a", "b"], 0.01)},
+                on_done=lambda name, stats: done.append(name),
+            ):
+                items.append(item)
+        return items
+
+    items = asyncio.run(scenario())
+    # Le flux sain est relayé jusqu'au bout malgré l'erreur de l'autre
+    assert ("sain", "b") in items and ("cassé", "début") in items
+    assert sorted(done) == ["cassé", "sain"]
+
+
+def test_stopping_the_consumer_cancels_the_streams():
+    closed = []
+
+    async def scenario():
+        merged = merge_streams(
+            {
+                "a": partial(ticking, ["x"] * 100, 0.01, closed),
+                "b": partial(ticking, ["x"] * 100, 0.01, closed),
+            }
+        )
+        await merged.__anext__()
+        await merged.aclose()
+
+    asyncio.run(scenario())
+    assert closed == [True, True]
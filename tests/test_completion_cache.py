@@ -0,0 +1,53 @@
+from common.completion_cache import CompletionCache
+
+
+def test_key_ignores_whitespace_and_case_only():
+    key = CompletionCache.make_key("openai", "m", 0.2, "Quels  ingrédients\n?")
+    assert key == CompletionCache.make_key("openai", "m", 0.2, "quels ingrédients ?")
+    assert key != CompletionCache.make_key("claude", "m", 0.2, "quels ingrédients ?")
+    assert key != CompletionCache.make_key("openai", "m", None, "quels ingrédients ?")
+
+
+def test_lru_eviction_keeps_recently_read_entries():
+    cache = CompletionCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_are_misses():
+    cache = CompletionCache(ttl=-1)
+    cache.set("a", "A")
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_sqlite_persistence_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = CompletionCache(db_path=path)
+    cache.set("a", "A")
+    cache.close()
+
+    reopened = CompletionCache(db_path=path)
+    assert reopened.get("a") == "A"
+    assert reopened.stats()["disk_hits"] == 1
+    reopened.close()
+
+
+def test_sqlite_evicts_least_recently_used(tmp_path, monkeypatch):
+    # Horloge croissante: accessed_at départage les entrées sans ex aequo
+    ticks = iter(range(1_000_000_000, 2_000_000_000))
+    monkeypatch.setattr("common.completion_cache.time.time", lambda: next(ticks))
+    cache = CompletionCache(max_entries=1, db_path=str(tmp_path / "c.db"))
+    cache.max_db_entries = 2
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.set("c", "C")
+    assert cache.stats()["disk_entries"] == 2
+    assert cache.get("a") is None
+    assert cache.get("b") == "B"
+    cache.close()
@@ -0,0 +1,49 @@
+from common.entity_matcher import EntityMatcher
+from common.text import fold, normalize, tokenize
+
+
+def test_normalize_folds_accents_ligatures_and_plurals():
+    assert fold("Pâtes") == "pates"
+    assert normalize("Les Œufs") == "les oeuf"
+    assert tokenize("Crèmes brûlées!") == ["creme", "brulee"]
+    # Mots courts: pas de pluriel retiré
+    assert normalize("bus") == "bus"
+
+
+def matcher():
+    return EntityMatcher.from_catalog(
+        foods=["pizza", "pain", "pain perdu", "pâtes"],
+        books=["1984", "Gatsby le Magnifique"],
+        ingredients=["tomate", "sauce tomate", "œufs"],
+    )
+
+
+def test_analyze_finds_entities_and_intents():
+    result = matcher().analyze("Quels ingrédients pour des PIZZAS et le livre 1984 ?")
+    assert result["food"] == ["pizza"]
+    assert result["book"] == ["1984"]
+    assert result["intent"] == ["food", "book"]
+
+
+def test_matches_respect_word_boundaries():
+    result = matcher().analyze("Une pizzeria qui vend du painsec")
+    assert result["food"] == []
+
+
+def test_longest_name_wins_within_a_kind():
+    result = matcher().analyze("recette du pain perdu à la sauce tomate")
+    assert result["food"] == ["pain perdu"]
+    assert result["ingredient"] == ["sauce tomate"]
+
+
+def test_reverse_intent_and_ingredients():
+    result = matcher().analyze("Que cuisiner avec des oeufs et de la tomate ?")
+    assert "reverse" in result["intent"]
+    assert result["ingredient"] == ["œufs", "tomate"]
+
+
+def test_find_reports_positions_in_normalized_text():
+    (match,) = matcher().find("gatsby le magnifique")
+    assert match.kind == "book"
+    assert match.value == "Gatsby le Magnifique"
+    assert (match.start, match.end) == (0, len("gatsby le magnifique") + 1)
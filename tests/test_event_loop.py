@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from common.event_loop import BackgroundEventLoop
+
+
+@pytest.fixture
+def background():
+    loop = BackgroundEventLoop(name="test-loop", shutdown_timeout=2.0)
+    yield loop
+    loop.shutdown()
+
+
+def test_run_returns_results_and_raises_errors(background):
+    async def double(x):
+        await asyncio.sleep(0.01)
+        return 2 * x
+
+    async def fail():
+        raise ValueError("invalide")
+
+    assert background.run(double(21)) == 42
+    with pytest.raises(ValueError):
+        background.run(fail())
+
+
+def test_state_created_on_the_loop_survives_between_calls(background):
+    async def make_lock():
+        return asyncio.Lock()
+
+    async def use(lock):
+        async with lock:
+            return asyncio.get_running_loop()
+
+    # Objet lié à la boucle, réutilisé par un appel suivant
+    lock = background.run(make_lock())
+    assert background.run(use(lock)) is background.loop
+    assert background.run(use(lock)) is background.loop
+
+
+def test_timeout_cancels_the_coroutine(background):
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(TimeoutError):
+        background.run(slow(), timeout=0.05)
+    background.run(asyncio.sleep(0.05))
+    assert cancelled == [True]
+
+
+def test_stream_yields_chunks_and_closes_the_generator(background):
+    closed = []
+
+    async def chunks():
+        try:
+            for i in range(10):
+                yield i
+        finally:
+            closed.append(True)
+
+    assert list(background.stream(chunks())) == list(range(10))
+    assert closed == [True]
+
+    closed.clear()
+    # Appelant qui s'arrête en cours de route (rerun Streamlit)
+    stream = background.stream(chunks())
+    assert next(stream) == 0
+    stream.close()
+    assert closed == [True]
+
+
+def test_stream_timeout_applies_per_chunk(background):
+    async def stalled():
+        yield "début"
+        await asyncio.sleep(5)
+        yield "fin"
+
+    stream = background.stream(stalled(), timeout=0.05)
+    assert next(stream) == "début"
+    with pytest.raises(TimeoutError):
+        next(stream)
+
+
+def test_shutdown_runs_closers_in_reverse_and_cancels_tasks():
+    background = BackgroundEventLoop(name="test-loop", shutdown_timeout=2.0)
+    order, cancelled = [], []
+
+    async def close(name):
+        order.append(name)
+        if name == "cache":
+            raise RuntimeError("déjà fermé")
+
+    async def maintenance():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    background.on_shutdown(lambda: close("pool"))
+    background.on_shutdown(lambda: close("cache"))
+    background.on_shutdown(lambda: close("clients"))
+    background.submit(maintenance())
+    background.shutdown()
+
+    # Une fermeture en erreur n'empêche pas les suivantes
+    assert order == ["clients", "cache", "pool"]
+    assert cancelled == [True]
+    assert background.loop.is_closed()
+    background.shutdown()
+    coro = asyncio.sleep(0)
+    with pytest.raises(RuntimeError):
+        background.submit(coro)
@@ -0,0 +1,169 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from common.hedging import LatencyTracker, hedged_stream
+
+
+class Source:
+    """Faux fournisseur: premier morceau après delay, ou erreur"""
+
+    def __init__(self, name, delay=0.0, chunks=("a", "b"), error=None):
+        self.name = name
+        self.delay = delay
+        self.chunks = chunks
+        self.error = error
+        self.started = False
+        self.closed = False
+
+    async def __call__(self):
+        self.started = True
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            for chunk in self.chunks:
+                yield chunk
+        finally:
+            self.closed = True
+
+    @property
+    def pair(self):
+        return self.name, self
+
+
+def hedge(primary, secondary, hedge_after):
+    async def scenario():
+        return [
+            item
+            async for item in hedged_stream(primary.pair, secondary.pair, hedge_after)
+        ]
+
+    return asyncio.run(scenario())
+
+
+def test_fast_primary_wins_without_starting_secondary():
+    primary, secondary = Source("openai"), Source("claude")
+    assert hedge(primary, secondary, 0.2) == [("openai", "a"), ("openai", "b")]
+    assert not secondary.started
+    assert primary.closed
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    primary, secondary = Source("openai", delay=1.0), Source("claude", delay=0.01)
+    start = time.monotonic()
+    assert hedge(primary, secondary, 0.05) == [("claude", "a"), ("claude", "b")]
+    assert time.monotonic() - start < 0.5
+    assert primary.closed
+
+
+def test_primary_still_wins_if_it_answers_first_after_hedging():
+    primary, secondary = Source("openai", delay=0.1), Source("claude", delay=1.0)
+    assert hedge(primary, secondary, 0.05)[0] == ("openai", "a")
+    assert secondary.started and secondary.closed
+
+
+def test_primary_error_fails_over_immediately():
+    primary = Source("openai", error=RuntimeError("panne"))
+    secondary = Source("claude")
+    start = time.monotonic()
+    # Délai de relance très long: seule l'erreur peut lancer le second
+    assert hedge(primary, secondary, 10.0) == [("claude", "a"), ("claude", "b")]
+    assert time.monotonic() - start < 1.0
+
+
+def test_empty_primary_fails_over():
+    primary, secondary = Source("openai", chunks=()), Source("claude")
+    assert hedge(primary, secondary, 10.0)[0] == ("claude", "a")
+
+
+def test_both_failing_raises_the_last_error():
+    primary = Source("openai", error=RuntimeError("openai"))
+    secondary = Source("claude", delay=0.01, error=ValueError("claude"))
+    with pytest.raises(ValueError, match="claude"):
+        hedge(primary, secondary, 10.0)
+
+
+def test_consumer_stopping_early_closes_the_winner():
+    primary, secondary = Source("openai"), Source("claude")
+
+    async def scenario():
+        stream = hedged_stream(primary.pair, secondary.pair, 1.0)
+        assert await stream.__anext__() == ("openai", "a")
+        await stream.aclose()
+
+    asyncio.run(scenario())
+    assert primary.closed
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = LatencyTracker(window=100)
+    for i in range(5):
+        tracker.record("openai", i / 10)
+    assert tracker.percentile("openai", 0.95, default=2.0) == 2.0
+    assert tracker.percentile("claude", 0.95, default=2.0) == 2.0
+    for i in range(5, 100):
+        tracker.record("openai", i / 10)
+    assert tracker.percentile("openai", 0.5) == 5.0
+    assert tracker.percentile("openai", 0.95) == 9.5
+    assert tracker.percentile("openai", 1.0) == 9.9
+
+
+def test_latency_window_forgets_old_samples():
+    tracker = LatencyTracker(window=10)
+    for seconds in [100.0] * 10 + [1.0] * 10:
+        tracker.record("openai", seconds)
+    assert tracker.percentile("openai", 1.0) == 1.0
+
+
+def test_observe_records_time_to_first_chunk():
+    tracker = LatencyTracker()
+
+    async def scenario():
+        source = Source("openai", delay=0.05)
+        return [chunk async for chunk in tracker.observe("openai", source())]
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert tracker.stats()["openai"]["samples"] == 1
+    assert tracker.stats()["openai"]["p50"] >= 0.05
+
+
+def test_stream_fastest_fails_over_to_claude(mock_llm, monkeypatch):
+    pytest.importorskip("openai")
+    pytest.importorskip("anthropic")
+    from common.completion_cache import CompletionCache
+    from common.llm_providers import LLMProviders
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("CLAUD_API_KEY", "test")
+    monkeypatch.setenv("LLM_PRIMARY", "openai")
+    monkeypatch.setattr(
+        mock_llm, "config", mock_llm.MockConfig(answer="Réponse de secours")
+    )
+    # Port fermé: l'appel OpenAI échoue aussitôt à la connexion
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        closed_port = sock.getsockname()[1]
+    providers = LLMProviders(
+        "gpt-test",
+        "claude-test",
+        CompletionCache(),
+        openai_base_url=f"http://127.0.0.1:{closed_port}/v1",
+        claude_base_url=mock_llm.url,
+    )
+    winners = []
+
+    async def scenario():
+        try:
+            stream = providers.stream_fastest("Bonjour", on_winner=winners.append)
+            return "".join([text async for text in stream])
+        finally:
+            await providers.close()
+
+    assert asyncio.run(scenario()) == "Réponse de secours"
+    assert winners == ["claude"]
+    # Réponse du fournisseur retenu mise en cache, sans reprise côté OpenAI
+    assert providers.cache.get(providers.cache_key("claude", "Bonjour"))
+    assert providers.schedulers["openai"].stats()["retries"] == 0
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from common.ingredient_index import IngredientIndex, intersect, union
+
+
+@pytest.mark.parametrize("sizes", [(50, 60), (5, 2000), (2000, 3), (0, 100)])
+def test_intersect_matches_set_intersection(sizes):
+    rng = random.Random(sum(sizes))
+    # (5, 2000) et (2000, 3): recherche par galop dans la liste longue
+    left, right = (sorted(rng.sample(range(5000), size)) for size in sizes)
+    assert intersect(left, right) == sorted(set(left) & set(right))
+
+
+def test_intersect_galloping_stops_past_the_end():
+    assert intersect([1, 9999], list(range(0, 100, 2))) == []
+    assert intersect([0, 98], list(range(0, 100, 2))) == [0, 98]
+
+
+def test_union_merges_without_duplicates():
+    assert union([[1, 4, 7], [2, 4, 8], []]) == [1, 2, 4, 7, 8]
+    assert union([]) == []
+
+
+def test_query_and_or(catalog_data):
+    foods, _ = catalog_data
+    index = IngredientIndex(foods)
+    both = index.query(["Beurre", "AIL"])
+    assert both == sorted(
+        dish for dish, items in foods.items() if {"beurre", "ail"} <= set(items)
+    )
+    either = index.query(["safran", "citron"], mode="or")
+    assert either == sorted(
+        dish for dish, items in foods.items() if {"safran", "citron"} & set(items)
+    )
+    assert index.query(["safran", "citron"], mode="or", limit=3) == either[:3]
+    assert index.query(["introuvable", "tomate"]) == []
+    assert index.query([]) == []
+
+
+def test_compound_ingredients_are_indexed_by_word():
+    index = IngredientIndex(
+        {"pâtes": ["sauce tomate", "pâtes"], "salade": ["tomate", "laitue"]}
+    )
+    assert index.query(["sauce tomate"]) == ["pâtes"]
+    assert index.query(["sauce"]) == ["pâtes"]
+    assert index.query(["tomate"]) == ["pâtes", "salade"]
+    assert "sauce tomate" in index.ingredients()
+
+
+def test_from_postings_behaves_like_built_index(catalog_data):
+    foods, _ = catalog_data
+    built = IngredientIndex(foods)
+    loaded = IngredientIndex.from_postings(built.dishes, built.postings)
+    assert loaded.query(["œufs", "parmesan"]) == built.query(["œufs", "parmesan"])
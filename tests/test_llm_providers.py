@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("anthropic")
+
+from common.completion_cache import CompletionCache
+from common.llm_providers import LLMProviders
+
+
+@pytest.fixture(autouse=True)
+def provider_env(monkeypatch, mock_llm):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("CLAUD_API_KEY", "test")
+    # Reprises rapides: le faux serveur demande 10 ms d'attente après un 429
+    monkeypatch.setenv("OPENAI_MAX_RETRIES", "2")
+    monkeypatch.setenv("CLAUDE_MAX_RETRIES", "1")
+    mock_llm.config = mock_llm.MockConfig(retry_after=0.01, answer="Réponse simulée")
+    yield
+    mock_llm.config = mock_llm.MockConfig()
+
+
+def make_providers(mock_llm, **urls):
+    return LLMProviders(
+        "gpt-test",
+        "claude-test",
+        CompletionCache(),
+        openai_base_url=urls.get("openai", f"{mock_llm.url}/v1"),
+        claude_base_url=urls.get("claude", mock_llm.url),
+    )
+
+
+def run(providers, coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await providers.close()
+
+    return asyncio.run(scenario())
+
+
+async def collect(agen):
+    return [item async for item in agen]
+
+
+@pytest.mark.parametrize("name", ["openai", "claude"])
+def test_answer_is_completed_then_cached(mock_llm, name):
+    providers = make_providers(mock_llm)
+
+    async def scenario():
+        first = await providers.answer(name, "Quels ingrédients ?")
+        # Serveur en panne: la seconde réponse vient du cache
+        mock_llm.config = mock_llm.MockConfig(error_rate=1.0)
+        second = await providers.answer(name, "quels  ingrédients ?")
+        return first, second
+
+    assert run(providers, scenario()) == ("Réponse simulée", "Réponse simulée")
+    assert providers.cache.stats()["hits"] == 1
+
+
+def test_rate_limits_are_retried_then_reported(mock_llm):
+    mock_llm.config = mock_llm.MockConfig(rate_limit_rate=1.0, retry_after=0.01)
+    providers = make_providers(mock_llm)
+    answer = run(providers, providers.answer("openai", "Bonjour"))
+    assert answer.startswith("Erreur OpenAI:")
+    assert providers.schedulers["openai"].stats()["retries"] == 2
+    assert providers.schedulers["openai"].stats()["throttled"] == 3
+
+
+def test_identical_concurrent_calls_share_one_request(mock_llm):
+    mock_llm.config = mock_llm.MockConfig(latency="fixed:0.1", answer="Partagée")
+    providers = make_providers(mock_llm)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(providers.answer("claude", "Même question") for _ in range(4))
+        )
+
+    assert run(providers, scenario()) == ["Partagée"] * 4
+    assert providers.flights.stats()["started"] == 1
+
+
+@pytest.mark.parametrize("name", ["openai", "claude"])
+def test_cached_stream_yields_chunks_then_caches(mock_llm, name):
+    mock_llm.config = mock_llm.MockConfig(answer="un deux trois")
+    providers = make_providers(mock_llm)
+
+    async def scenario():
+        chunks = await collect(providers.cached_stream(name, "Compte"))
+        cached = await collect(providers.cached_stream(name, "Compte"))
+        return chunks, cached
+
+    chunks, cached = run(providers, scenario())
+    assert "".join(chunks) == "un deux trois"
+    assert len(chunks) > 1
+    assert cached == ["un deux trois"]
+    assert providers.ttft.stats()[name]["samples"] == 1
+
+
+def test_stream_errors_become_a_message(mock_llm):
+    mock_llm.config = mock_llm.MockConfig(error_rate=1.0)
+    providers = make_providers(mock_llm)
+    chunks = run(providers, collect(providers.cached_stream("claude", "Bonjour")))
+    assert len(chunks) == 1 and chunks[0].startswith("Erreur Claude:")
+
+
+def test_stream_compare_interleaves_both_providers(mock_llm):
+    mock_llm.config = mock_llm.MockConfig(answer="a b c", tokens_per_second=100)
+    providers = make_providers(mock_llm)
+    done = {}
+
+    items = run(
+        providers,
+        collect(providers.stream_compare("Compare", lambda n, s: done.update({n: s}))),
+    )
+    for name in ("openai", "claude"):
+        assert "".join(text for n, text in items if n == name) == "a b c"
+    assert set(done) == {"openai", "claude"}
+    assert done["openai"]["ttft_s"] <= done["openai"]["latence_s"]
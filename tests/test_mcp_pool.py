@@ -0,0 +1,115 @@
+import asyncio
+import sys
+
+import pytest
+
+pytest.importorskip("mcp")
+
+from conftest import ROOT
+
+sys.path.append(str(ROOT / "implMCP"))
+from mcp_pool import MCPClientPool
+
+
+class FakeClient:
+    """Client MCP sans sous-processus"""
+
+    def __init__(self):
+        self.connected = False
+        self.healthy = True
+
+    async def connect(self):
+        self.connected = True
+        return True
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def ping(self):
+        return self.healthy
+
+
+def make_pool(**kwargs):
+    kwargs.setdefault("health_interval", 3600)
+    return MCPClientPool(client_factory=FakeClient, **kwargs)
+
+
+def test_start_prefills_min_size():
+    async def scenario():
+        async with make_pool(size=4, min_size=2) as pool:
+            assert pool.stats()["idle"] == 2
+            async with pool.acquire() as client:
+                assert client.connected
+                assert pool.stats()["in_use"] == 1
+            assert pool.stats()["idle"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_dead_client_is_respawned_in_background():
+    async def scenario():
+        pool = await make_pool(size=3, min_size=2).start()
+        async with pool.acquire() as client:
+            client.connected = False
+        # Le client mort n'est pas rendu au pool; la relance est suivie
+        assert len(pool._background) == 1
+        await asyncio.gather(*pool._background)
+        assert pool.stats()["total"] == 2
+        assert all(p.alive for p in pool._idle)
+        await pool.close()
+        assert pool.stats()["total"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_close_waits_for_background_respawn():
+    async def scenario():
+        pool = await make_pool(size=2, min_size=1).start()
+        async with pool.acquire() as client:
+            client.connected = False
+        await pool.close()
+        assert not pool._background
+        assert pool.stats()["total"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_idle_and_unhealthy_clients_are_evicted():
+    async def scenario():
+        pool = await make_pool(size=3, min_size=1, idle_timeout=0).start()
+        async with pool.acquire(), pool.acquire(), pool.acquire():
+            assert pool.stats()["total"] == 3
+        # Inactifs au-delà de min_size: fermés jusqu'à revenir au minimum
+        await pool._check_idle_clients()
+        assert pool.stats()["total"] == 1
+
+        pool._idle[0].client.healthy = False
+        await pool._check_idle_clients()
+        assert pool.stats()["total"] == 0
+        await pool._fill()
+        assert pool.stats()["idle"] == 1
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_acquire_times_out_when_pool_is_exhausted():
+    async def scenario():
+        async with make_pool(size=1, min_size=1, acquire_timeout=0.05) as pool:
+            async with pool.acquire():
+                with pytest.raises(TimeoutError):
+                    async with pool.acquire():
+                        pass
+
+    asyncio.run(scenario())
+
+
+def test_closed_pool_refuses_acquire():
+    async def scenario():
+        pool = await make_pool(size=1).start()
+        await pool.close()
+        with pytest.raises(RuntimeError):
+            async with pool.acquire():
+                pass
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+import pytest
+
+from common.book_search import BookSearchIndex
+from common.catalog import load_catalog, write_catalog
+from common.ingredient_index import IngredientIndex
+from common.mmap_catalog import MmapCatalog
+from common.pagination import paginate
+
+
+@pytest.fixture
+def mmap_snapshot(tmp_path, catalog_data):
+    foods, books = catalog_data
+    path = tmp_path / "catalog.cat"
+    write_catalog(path, foods, books)
+    return load_catalog(path, version="v1").warm()
+
+
+def test_sections_round_trip(mmap_snapshot, catalog_data):
+    foods, books = catalog_data
+    assert dict(mmap_snapshot.foods) == foods
+    assert dict(mmap_snapshot.books) == books
+    assert len(mmap_snapshot.foods) == len(foods)
+    assert "pâtes carbonara" in mmap_snapshot.foods
+    assert "absent" not in mmap_snapshot.foods
+    assert 3 not in mmap_snapshot.foods
+    with pytest.raises(KeyError):
+        mmap_snapshot.foods["absent"]
+
+
+def test_sorted_keys_index_slice_and_paginate(mmap_snapshot, catalog_data):
+    foods, _ = catalog_data
+    keys = mmap_snapshot.food_keys
+    expected = sorted(foods)
+    assert len(keys) == len(expected)
+    assert keys[0] == expected[0]
+    assert keys[-1] == expected[-1]
+    assert keys[10:20] == expected[10:20]
+    with pytest.raises(IndexError):
+        keys[len(expected)]
+
+    collected, cursor = [], None
+    while True:
+        page, cursor = paginate(keys, cursor, 64)
+        collected.extend(page)
+        if cursor is None:
+            break
+    assert collected == expected
+
+
+def test_alias_index_lookups(mmap_snapshot):
+    assert mmap_snapshot.find_food("Pates Carbonara") == "pâtes carbonara"
+    assert mmap_snapshot.find_book("1984") == "1984"
+    assert mmap_snapshot.find_food("inconnu") is None
+
+
+def test_search_postings_are_read_from_the_file(mmap_snapshot, catalog_data):
+    foods, books = catalog_data
+    memory_ingredients = IngredientIndex(foods)
+    memory_books = BookSearchIndex({key: books[key] for key in sorted(books)})
+
+    # Index préconstruits: pas de reconstruction depuis les enregistrements
+    assert "ingredient_index" in vars(mmap_snapshot)
+    assert "book_search" in vars(mmap_snapshot)
+    postings = mmap_snapshot.ingredient_index.postings
+    assert dict(postings) == memory_ingredients.postings
+    bm25 = mmap_snapshot.book_search.postings
+    assert {term: [tuple(p) for p in bm25[term]] for term in bm25} == (
+        memory_books.postings
+    )
+
+    for query, mode in [(["tomate", "ail"], "and"), (["safran", "citron"], "or")]:
+        assert mmap_snapshot.ingredient_index.query(
+            query, mode
+        ) == memory_ingredients.query(query, mode)
+    for query in ["dystopie surveillance", "voyage en mer", "Orwell"]:
+        assert mmap_snapshot.book_search.search(query) == memory_books.search(query)
+
+
+def test_mapping_survives_file_replacement(tmp_path, catalog_data):
+    foods, books = catalog_data
+    path = tmp_path / "catalog.cat"
+    write_catalog(path, foods, books)
+    snapshot = load_catalog(path, version="v1")
+    write_catalog(path, {"soupe": ["eau"]}, {})
+    assert dict(snapshot.foods) == foods
+    assert list(load_catalog(path, version="v2").foods) == ["soupe"]
+
+
+def test_rejects_files_without_signature(tmp_path):
+    path = tmp_path / "bad.cat"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        MmapCatalog(path)
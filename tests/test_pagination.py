@@ -0,0 +1,52 @@
+import pytest
+
+from common.pagination import InvalidCursor, decode_cursor, encode_cursor, paginate
+
+KEYS = sorted(f"plat {i:03d}" for i in range(25)) + ["pâtes", "œufs"]
+
+
+def test_cursor_round_trip_is_url_safe():
+    for key in ["pâtes", "a/b?c", "œufs & co"]:
+        cursor = encode_cursor(key)
+        assert set(cursor) <= set(
+            "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_="
+        )
+        assert decode_cursor(cursor) == key
+
+
+def test_pages_cover_every_key_once():
+    pages, cursor = [], None
+    while True:
+        page, cursor = paginate(KEYS, cursor, 10)
+        pages.append(page)
+        if cursor is None:
+            break
+    assert [len(page) for page in pages] == [10, 10, 7]
+    assert sum(pages, []) == KEYS
+
+
+def test_exact_last_page_has_no_next_cursor():
+    page, cursor = paginate(KEYS, None, len(KEYS))
+    assert page == KEYS
+    assert cursor is None
+
+
+def test_without_limit_returns_the_rest():
+    _, cursor = paginate(KEYS, None, 5)
+    page, next_cursor = paginate(KEYS, cursor)
+    assert page == KEYS[5:]
+    assert next_cursor is None
+
+
+def test_cursor_points_at_a_key_not_a_position():
+    page, cursor = paginate(KEYS, None, 3)
+    # Catalogue rechargé entre deux pages: une clé insérée avant le curseur
+    reloaded = sorted(KEYS + ["plat 000a"])
+    next_page, _ = paginate(reloaded, cursor, 3)
+    assert next_page == KEYS[3:6]
+
+
+@pytest.mark.parametrize("cursor", ["%%%", "abc", "//8="])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        paginate(KEYS, cursor, 10)
@@ -0,0 +1,193 @@
+import asyncio
+import time
+
+import pytest
+
+from common.provider_scheduler import (
+    AdaptiveConcurrency,
+    ProviderDeadlineExceeded,
+    ProviderScheduler,
+    TokenBucket,
+)
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class HTTPError(Exception):
+    """Imite les erreurs des SDK: status_code et response.headers"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = Response(headers or {})
+
+
+class Flaky:
+    """Échoue avec les erreurs données, puis répond "ok" """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def chunks(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        for chunk in ["a", "b"]:
+            yield chunk
+
+
+def scheduler(**options):
+    return ProviderScheduler("test", base_delay=0.001, max_delay=0.01, **options)
+
+
+def test_server_errors_are_retried_until_success():
+    flaky = Flaky(HTTPError(500), HTTPError(503))
+    provider = scheduler()
+    assert asyncio.run(provider.run(flaky)) == "ok"
+    assert flaky.calls == 3
+    assert provider.stats()["retries"] == 2
+    assert provider.stats()["throttled"] == 2
+
+
+def test_retries_give_up_after_max_retries():
+    flaky = Flaky(*(HTTPError(500) for _ in range(5)))
+    with pytest.raises(HTTPError):
+        asyncio.run(scheduler(max_retries=2).run(flaky))
+    assert flaky.calls == 3
+
+
+def test_non_retryable_errors_are_raised_immediately():
+    flaky = Flaky(HTTPError(400), ValueError("invalide"))
+    provider = scheduler()
+    with pytest.raises(HTTPError):
+        asyncio.run(provider.run(flaky))
+    with pytest.raises(ValueError):
+        asyncio.run(provider.run(flaky))
+    assert flaky.calls == 2
+    assert provider.retries == 0
+
+
+def test_connection_errors_listed_as_retryable_are_retried():
+    flaky = Flaky(ConnectionError("reset"))
+    provider = scheduler(retryable=(ConnectionError,))
+    assert asyncio.run(provider.run(flaky)) == "ok"
+    assert flaky.calls == 2
+
+
+def test_retry_after_is_honoured():
+    flaky = Flaky(HTTPError(429, {"retry-after-ms": "150"}))
+    provider = scheduler()
+    start = time.monotonic()
+    assert asyncio.run(provider.run(flaky)) == "ok"
+    assert time.monotonic() - start >= 0.15
+
+
+def test_rate_limit_pauses_later_calls_even_without_retry():
+    provider = scheduler()
+    flaky = Flaky(HTTPError(429, {"retry-after": "30"}))
+    with pytest.raises(HTTPError):
+        asyncio.run(provider.run(flaky, max_retries=0))
+    assert provider._paused_until > time.monotonic() + 25
+    # Pause plus longue que l'échéance: l'appel suivant échoue sans partir
+    with pytest.raises(ProviderDeadlineExceeded):
+        asyncio.run(provider.run(flaky, timeout=1))
+    assert flaky.calls == 1
+
+
+def test_retry_after_beyond_deadline_raises_the_error():
+    flaky = Flaky(HTTPError(429, {"retry-after": "10"}))
+    with pytest.raises(HTTPError):
+        asyncio.run(scheduler().run(flaky, timeout=0.5))
+    assert flaky.calls == 1
+
+
+def test_stream_retries_only_before_the_first_chunk():
+    provider = scheduler()
+
+    async def collect(factory):
+        return [chunk async for chunk in provider.stream(factory)]
+
+    flaky = Flaky(HTTPError(502))
+    assert asyncio.run(collect(flaky.chunks)) == ["a", "b"]
+    assert flaky.calls == 2
+
+    calls = []
+
+    async def cut_off():
+        calls.append(1)
+        yield "a"
+        raise HTTPError(500)
+
+    with pytest.raises(HTTPError):
+        asyncio.run(collect(cut_off))
+    assert len(calls) == 1
+
+
+def test_slow_call_exceeds_deadline():
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(ProviderDeadlineExceeded):
+        asyncio.run(scheduler().run(slow, timeout=0.05))
+
+
+def test_concurrency_limit_is_aimd():
+    async def scenario():
+        limiter = AdaptiveConcurrency(8)
+        await limiter.acquire()
+        await limiter.release(throttled=True)
+        assert limiter.limit == 4
+        await limiter.acquire()
+        await limiter.release(throttled=True)
+        assert limiter.limit == 2
+        for _ in range(4):
+            await limiter.acquire()
+            await limiter.release()
+        # +1/limite par succès: 2 -> 2.5 -> 2.9 -> ~3.24 -> ~3.55
+        assert 3.5 < limiter.limit < 3.6
+        for _ in range(10):
+            await limiter.acquire()
+            await limiter.release(throttled=True)
+        assert limiter.limit == limiter.min_limit
+
+    asyncio.run(scenario())
+
+
+def test_concurrency_limit_blocks_until_release():
+    async def scenario():
+        limiter = AdaptiveConcurrency(1)
+        await limiter.acquire()
+        with pytest.raises(ProviderDeadlineExceeded):
+            await limiter.acquire(deadline=time.monotonic() + 0.05)
+        await limiter.release()
+        await limiter.acquire(deadline=time.monotonic() + 0.05)
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_waits_for_refill_within_deadline():
+    async def scenario():
+        # 600/min = 10 jetons par seconde
+        bucket = TokenBucket(600, capacity=2)
+        await bucket.take(2)
+        start = time.monotonic()
+        await bucket.take(1, deadline=start + 1)
+        assert time.monotonic() - start >= 0.09
+        with pytest.raises(ProviderDeadlineExceeded):
+            await bucket.take(2, deadline=time.monotonic() + 0.05)
+
+    asyncio.run(scenario())
+
+
+def test_estimate_tokens():
+    assert ProviderScheduler.estimate_tokens("x" * 400, 256) == 356
@@ -0,0 +1,73 @@
+import json
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.append(str(ROOT / "implAPI"))
+from response_cache import PreparedResponses, etag_matches, prepare
+
+
+class Snapshot:
+    def __init__(self, version):
+        self.version = version
+
+
+def build(snapshot, name):
+    return {"plat": name, "version": snapshot.version} if name != "absent" else None
+
+
+def test_prepare_is_deterministic_json_with_strong_etag():
+    first, second = prepare({"plat": "pâtes"}), prepare({"plat": "pâtes"})
+    assert json.loads(first.body) == {"plat": "pâtes"}
+    assert first.etag == second.etag
+    assert first.etag.startswith('"') and not first.etag.startswith("W/")
+    assert prepare({"plat": "pizza"}).etag != first.etag
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, False),
+        ("", False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"x", W/"abc"', True),
+        ('"abcd"', False),
+        ("*", True),
+    ],
+)
+def test_etag_matches_weak_and_lists(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_entries_are_reused_until_the_catalog_changes():
+    responses = PreparedResponses()
+    v1 = Snapshot("v1")
+    first = responses.get(v1, "food", "pizza", build)
+    assert responses.get(v1, "food", "pizza", build) is first
+    reloaded = responses.get(Snapshot("v2"), "food", "pizza", build)
+    assert reloaded is not first
+    assert json.loads(reloaded.body)["version"] == "v2"
+
+
+def test_misses_are_not_cached_and_do_not_evict():
+    responses = PreparedResponses(max_entries=2)
+    snapshot = Snapshot("v1")
+    hot = responses.get(snapshot, "food", "pizza", build)
+    for _ in range(10):
+        assert responses.get(snapshot, "food", "absent", build) is None
+    assert len(responses._entries) == 1
+    assert responses.get(snapshot, "food", "pizza", build) is hot
+
+
+def test_least_recently_used_entry_is_evicted():
+    responses = PreparedResponses(max_entries=2)
+    snapshot = Snapshot("v1")
+    pizza = responses.get(snapshot, "food", "pizza", build)
+    responses.get(snapshot, "food", "salade", build)
+    responses.get(snapshot, "food", "pizza", build)
+    responses.get(snapshot, "food", "omelette", build)
+    assert list(responses._entries) == [("food", "pizza"), ("food", "omelette")]
+    assert responses.get(snapshot, "food", "pizza", build) is pizza
@@ -0,0 +1,129 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from common.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "résultat"
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+        assert results == ["résultat"] * 5
+        assert flights.stats() == {"started": 1, "shared": 4, "in_flight": 0}
+        # Terminé: l'appel suivant relance le travail
+        await flights.do("k", work)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_errors_are_shared():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("panne")
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(
+            flights.do("k", fail), flights.do("k", fail), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    async def work():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def scenario():
+        flights = SingleFlight()
+        first = asyncio.ensure_future(flights.do("k", work))
+        second = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == 42
+
+    asyncio.run(scenario())
+
+
+async def counting_source(produced, closed, count=50, delay=0.005):
+    try:
+        for i in range(count):
+            await asyncio.sleep(delay)
+            produced.append(i)
+            yield i
+    finally:
+        closed.append(True)
+
+
+def test_stream_is_shared_and_replayed_to_late_subscribers():
+    produced, closed = [], []
+
+    async def scenario():
+        flights = SingleFlight()
+        source = partial(counting_source, produced, closed, count=5)
+        first = flights.stream("k", source)
+        assert await first.__anext__() == 0
+        # Arrivé en retard: reçoit aussi les morceaux déjà produits
+        late = [chunk async for chunk in flights.stream("k", source)]
+        rest = [chunk async for chunk in first]
+        assert late == [0, 1, 2, 3, 4]
+        assert rest == [1, 2, 3, 4]
+        assert flights.stats()["started"] == 1
+
+    asyncio.run(scenario())
+    assert produced == [0, 1, 2, 3, 4]
+
+
+def test_stream_errors_reach_every_subscriber():
+    async def broken():
+        yield "début"
+        raise RuntimeError("coupure")
+
+    async def scenario():
+        flights = SingleFlight()
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                async for _ in flights.stream("k", broken):
+                    pass
+
+    asyncio.run(scenario())
+
+
+def test_stream_stops_when_the_last_subscriber_leaves():
+    produced, closed = [], []
+
+    async def scenario():
+        flights = SingleFlight()
+        source = partial(counting_source, produced, closed)
+        first, second = flights.stream("k", source), flights.stream("k", source)
+        await first.__anext__()
+        await second.__anext__()
+        await first.aclose()
+        await asyncio.sleep(0.03)
+        # Un abonné reste: le flux continue
+        assert not closed
+        await second.aclose()
+        await asyncio.sleep(0.01)
+        assert closed == [True]
+        stopped_at = len(produced)
+        await asyncio.sleep(0.03)
+        assert len(produced) == stopped_at < 50
+
+        # Flux abandonné: un nouvel appel repart de zéro
+        fresh = flights.stream("k", source)
+        assert await fresh.__anext__() == 0
+        await fresh.aclose()
+
+    asyncio.run(scenario())
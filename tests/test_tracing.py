@@ -0,0 +1,131 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from common.tracing import Histogram, LogExporter, MemoryExporter, Tracer
+
+
+def test_histogram_quantile_is_a_bucket_bound():
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    assert histogram.quantile(0.5) is None
+    for value in [0.05, 0.5, 0.5, 5.0]:
+        histogram.observe(value)
+    assert histogram.quantile(0.25) == 0.1
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(1.0) == 10.0
+
+
+def test_histogram_quantile_beyond_last_bucket_is_finite():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for _ in range(10):
+        histogram.observe(60.0)
+    # Borne de la dernière tranche plutôt que inf, qui n'est pas du JSON
+    assert histogram.quantile(0.95) == 1.0
+
+
+def test_nested_spans_share_trace_and_link_parent():
+    exporter = MemoryExporter()
+    tracer = Tracer([exporter])
+    with tracer.span("api", route="/food") as outer:
+        with tracer.span("provider.openai") as inner:
+            inner.set(tokens=12)
+    child, parent = exporter.spans
+    assert child["parent_id"] == outer.span_id
+    assert child["trace_id"] == parent["trace_id"]
+    assert parent["parent_id"] is None
+    assert child["attributes"] == {"tokens": 12}
+    assert parent["attributes"] == {"route": "/food"}
+
+
+def test_errors_mark_the_span_and_propagate():
+    exporter = MemoryExporter()
+    tracer = Tracer([exporter])
+    with pytest.raises(ValueError):
+        with tracer.span("catalog.load"):
+            raise ValueError("fichier absent")
+    (span,) = exporter.spans
+    assert span["status"] == "error"
+    assert "fichier absent" in span["attributes"]["error"]
+    assert "catalog.load (error)" in tracer.summary()
+
+
+def test_deferred_span_ends_after_the_wrapped_stream():
+    exporter = MemoryExporter()
+    tracer = Tracer([exporter])
+
+    async def body():
+        for chunk in ["a", "b"]:
+            await asyncio.sleep(0.05)
+            yield chunk
+
+    async def scenario():
+        with tracer.span("api GET /stream") as span:
+            span.defer()
+        # Sortie du with: la réponse n'est pas encore envoyée
+        assert not exporter.spans
+        return [chunk async for chunk in span.wrap(body())]
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    (span,) = exporter.spans
+    assert span["duration_ms"] >= 100
+
+
+def test_stream_records_time_to_first_chunk():
+    exporter = MemoryExporter()
+    tracer = Tracer([exporter])
+
+    async def chunks():
+        await asyncio.sleep(0.02)
+        yield "a"
+        await asyncio.sleep(0.02)
+        yield "b"
+
+    async def scenario():
+        return [c async for c in tracer.stream("provider.claude.stream", chunks())]
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    (span,) = exporter.spans
+    assert 20 <= span["attributes"]["ttft_ms"] < span["duration_ms"]
+    summary = tracer.summary()
+    assert summary["provider.claude.stream.ttft"]["count"] == 1
+    assert summary["provider.claude.stream"]["count"] == 1
+
+
+def test_summary_is_json_serializable():
+    tracer = Tracer()
+    tracer.observe("lent", 120.0)
+    tracer.observe("rapide", 0.002)
+    summary = json.loads(json.dumps(tracer.summary(), allow_nan=False))
+    assert summary["lent"]["p95_ms"] == 30_000.0
+    assert summary["rapide"] == {
+        "count": 1,
+        "mean_ms": 2.0,
+        "p50_ms": 2.5,
+        "p95_ms": 2.5,
+    }
+
+
+def test_prometheus_buckets_are_cumulative():
+    tracer = Tracer(buckets=(0.1, 1.0))
+    for seconds in [0.05, 0.5, 5.0]:
+        tracer.observe("api GET /food/{food_name:path}", seconds)
+    text = tracer.render_prometheus()
+    labels = 'span="api GET /food/{food_name:path}",status="ok"'
+    assert f'span_duration_seconds_bucket{{{labels},le="0.1"}} 1' in text
+    assert f'span_duration_seconds_bucket{{{labels},le="1.0"}} 2' in text
+    assert f'span_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in text
+    assert f"span_duration_seconds_count{{{labels}}} 3" in text
+
+
+def test_failing_exporter_does_not_break_the_span(capsys):
+    def broken(span):
+        raise RuntimeError("collecteur injoignable")
+
+    output = io.StringIO()
+    tracer = Tracer([broken, LogExporter(output)])
+    with tracer.span("étape"):
+        pass
+    assert json.loads(output.getvalue())["name"] == "étape"
+    assert "collecteur injoignable" in capsys.readouterr().err